@@ -0,0 +1,193 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError, connection, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'api:version:{}'
+CHANGED_KEY = 'api:changed:{}'
+RESPONSE_KEY = 'api:response:{}:{}'
+STALE_KEY = 'api:stale:{}'
+
+
+# Кэши, которые не видны другим процессам: версии в них не доходят
+# до соседних обработчиков gunicorn и команд manage.py.
+LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def cache_shared():
+    """Кэш общий для процессов, и по его версиям можно кэшировать."""
+    return not isinstance(caches['default'], LOCAL_CACHES)
+
+
+def _version_key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def _initial_version():
+    # Версия, потерянная при вытеснении из кэша, начинается заново
+    # с большего значения и не совпадает со старыми ключами ответов.
+    return int(time.time() * 1000)
+
+
+def get_versions(models):
+    """Текущие версии данных моделей."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_changed(models):
+    """Время последнего изменения моделей (unix time)."""
+    keys = [CHANGED_KEY.format(model._meta.label_lower) for model in models]
+    changed = cache.get_many(keys)
+    for key in keys:
+        if key not in changed:
+            cache.add(key, time.time(), None)
+            changed[key] = cache.get(key)
+    return [changed[key] for key in keys]
+
+
+def bump_version(model):
+    """Сменить версию модели: закэшированные ответы устаревают."""
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+    cache.set(CHANGED_KEY.format(model._meta.label_lower), time.time(), None)
+
+
+def invalidate(*models):
+    """Сменить версии моделей сейчас и ещё раз после фиксации транзакции.
+
+    Ответ, собранный параллельным запросом до фиксации, мог попасть
+    в кэш уже под новой версией; повторная смена отбрасывает его.
+    """
+    def bump():
+        for model in models:
+            bump_version(model)
+
+    bump()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump)
+
+
+class ResponseCacheMixin:
+    """Кэширование списков для анонимных GET-запросов.
+
+    Ключ ответа строится из URL запроса и версий моделей cache_models.
+    Версии меняют сигналы сохранения и удаления (api.signals), поэтому
+    старые ответы перестают находиться без перебора ключей. Кэш должен
+    быть общим для процессов (cache_shared), иначе запись в одном
+    процессе не меняет версий в другом, и кэширование отключается.
+    При ошибке базы данных отдаётся последний удачный ответ, пока он
+    не старше RESPONSE_CACHE_STALE_TIMEOUT.
+    """
+
+    cache_models = ()
+
+    def _response_cacheable(self, request):
+        return (
+            self.cache_models
+            and request.method == 'GET'
+            and not request.user.is_authenticated
+            and cache_shared()
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self._response_cacheable(request):
+            return super().list(request, *args, **kwargs)
+
+        url_hash = hashlib.md5(
+            request.build_absolute_uri().encode()
+        ).hexdigest()
+        versions = '.'.join(map(str, get_versions(self.cache_models)))
+        key = RESPONSE_KEY.format(url_hash, versions)
+        stale_key = STALE_KEY.format(url_hash)
+
+        data = cache.get(key)
+        if data is not None:
+            return self._cached_response(data, 'HIT')
+
+        try:
+            response = super().list(request, *args, **kwargs)
+        except DatabaseError:
+            data = cache.get(stale_key)
+            if data is None:
+                raise
+            return self._cached_response(data, 'STALE')
+
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+            cache.set(
+                stale_key, response.data,
+                settings.RESPONSE_CACHE_STALE_TIMEOUT,
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def _cached_response(self, data, state):
+        response = Response(data)
+        response['X-Cache'] = state
+        return response
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы по ETag и Last-Modified.
+
+    Валидаторы строятся только из версий моделей etag_models в общем
+    кэше, поэтому ответ 304 отдаётся без запросов к базе, а при её
+    отказе ответ остаётся за ResponseCacheMixin. С кэшем одного
+    процесса (см. cache_shared) валидаторы не выдаются: версии в нём
+    не знают о чужих записях, и 304 отдавался бы бессрочно.
+    """
+
+    etag_models = ()
+
+    def _validators(self, request):
+        source = '|'.join(map(str, [
+            request.build_absolute_uri(),
+            request.META.get('HTTP_ACCEPT', ''),
+            get_versions(self.etag_models),
+        ]))
+        etag = '"%s"' % hashlib.md5(source.encode()).hexdigest()
+        return etag, int(max(get_changed(self.etag_models)))
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        if (
+            not self.etag_models
+            or request.method not in ('GET', 'HEAD')
+            or not cache_shared()
+        ):
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self._validators(request)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if status.is_success(response.status_code):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
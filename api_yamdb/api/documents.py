@@ -0,0 +1,165 @@
+"""Материализованные JSON-документы произведений.
+
+Документ хранит результат TitleListSerializer, поэтому список и
+карточка произведения собираются из готовых документов без работы
+полей сериализатора и запросов жанров и категории. Рейтинг меняется
+с каждым отзывом и подставляется из накопленных сумм самого Title.
+"""
+import json
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+from reviews.models import Title, TitleDocument
+
+from .serializers import TitleListSerializer
+
+RATING_FIELD = 'rating'
+# Так пустой рейтинг записан в тексте документа (json.dumps по умолчанию).
+RATING_PLACEHOLDER = f'"{RATING_FIELD}": null'
+BATCH_SIZE = 500
+
+_state = threading.local()
+
+
+@contextmanager
+def documents_suspended():
+    """Не пересобирать документы по сигналам внутри блока.
+
+    Нужно для массовой загрузки: после неё документы пересобираются
+    целиком одним вызовом rebuild_title_documents().
+    """
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = False
+
+
+def documents_active():
+    return not getattr(_state, 'suspended', False)
+
+
+def render_title(title):
+    """Представление произведения через обычный сериализатор."""
+    return TitleListSerializer(title).data
+
+
+def _titles_for_render(title_ids):
+    """Произведения со всеми полями, категорией и жанрами."""
+    return Title.objects.select_related('category').prefetch_related(
+        'genre'
+    ).filter(pk__in=title_ids).order_by()
+
+
+@transaction.atomic(savepoint=False)
+def _rebuild_batch(title_ids):
+    # Параллельные пересборки одних произведений идут по очереди: иначе
+    # обе удаляют документ, и вставка второй падает на первичном ключе.
+    titles = _titles_for_render(title_ids).order_by('pk').select_for_update(
+        of=('self',)
+    )
+    documents = []
+    for title in titles:
+        data = render_title(title)
+        # Ключ остаётся на своём месте, значение подставляется при чтении.
+        data[RATING_FIELD] = None
+        documents.append(TitleDocument(
+            title_id=title.pk,
+            body=json.dumps(data, ensure_ascii=False),
+        ))
+
+    TitleDocument.objects.filter(pk__in=title_ids).delete()
+    TitleDocument.objects.bulk_create(documents)
+    return len(documents)
+
+
+def rebuild_title_documents(title_ids=None):
+    """Пересобрать документы произведений (все, если id не заданы)."""
+    if title_ids is None:
+        title_ids = Title.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ).iterator(chunk_size=BATCH_SIZE)
+
+    title_ids = iter(title_ids)
+    rebuilt = 0
+    batch = list(islice(title_ids, BATCH_SIZE))
+    while batch:
+        rebuilt += _rebuild_batch(batch)
+        batch = list(islice(title_ids, BATCH_SIZE))
+    return rebuilt
+
+
+def _has_document(title):
+    try:
+        title.document
+    except TitleDocument.DoesNotExist:
+        return False
+    return True
+
+
+def load_title_document(title):
+    """Документ произведения с актуальным рейтингом.
+
+    Произведение без документа собирается сериализатором из полной
+    выборки: у title из списка загружены не все поля.
+    """
+    if not _has_document(title):
+        return render_title(_titles_for_render([title.pk]).get())
+    data = json.loads(title.document.body)
+    data[RATING_FIELD] = title.rating
+    return data
+
+
+def load_title_documents(titles):
+    """Документы страницы: произведения без документов читаются разом."""
+    missing = [title.pk for title in titles if not _has_document(title)]
+    rendered = {}
+    if missing:
+        rendered = {
+            title.pk: render_title(title)
+            for title in _titles_for_render(missing)
+        }
+    return [
+        rendered[title.pk] if title.pk in rendered
+        else load_title_document(title)
+        for title in titles
+    ]
+
+
+def stream_title_documents(queryset, chunk_size=BATCH_SIZE):
+    """Документы произведений выборки строками NDJSON.
+
+    Строки читаются итератором (на PostgreSQL — серверным курсором),
+    рейтинг вписывается в текст документа без разбора JSON.
+    """
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'document__body', 'rating_sum', 'rating_count'
+    ).iterator(chunk_size=chunk_size)
+    for pk, body, rating_sum, rating_count in rows:
+        if body is None:
+            data = render_title(_titles_for_render([pk]).get())
+            yield json.dumps(data, ensure_ascii=False) + '\n'
+            continue
+        rating = Title(rating_sum=rating_sum, rating_count=rating_count).rating
+        yield body.replace(
+            RATING_PLACEHOLDER, f'"{RATING_FIELD}": {json.dumps(rating)}', 1
+        ) + '\n'
+
+
+class TitleDocumentListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        return load_title_documents(list(data))
+
+
+class TitleDocumentSerializer(serializers.BaseSerializer):
+    """Чтение произведения из материализованного документа."""
+
+    class Meta:
+        list_serializer_class = TitleDocumentListSerializer
+
+    def to_representation(self, instance):
+        return load_title_document(instance)
@@ -46,5 +46,26 @@ class ReviewUniqueExist(ValidationError):
     """Отзыв уже оставлен."""
 
     def __init__(self):
-        self.message = {"detail": "Отзыв уже оставлен"}
+        # Список, как у ошибок из validate() сериализатора.
+        self.message = {"detail": ["Отзыв уже оставлен"]}
+        super().__init__(self.message)
+
+
+class UnknownFieldsError(ValidationError):
+    """Запрошены несуществующие поля."""
+
+    def __init__(self, param, names):
+        self.message = {
+            param: "Неизвестные поля: " + ", ".join(sorted(names))
+        }
+        super().__init__(self.message)
+
+
+class BulkPayloadError(ValidationError):
+    """Тело массового запроса должно быть списком ограниченной длины."""
+
+    def __init__(self, limit):
+        self.message = {
+            "detail": f"Ожидается список не более чем из {limit} объектов"
+        }
         super().__init__(self.message)
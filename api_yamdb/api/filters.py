@@ -1,15 +1,39 @@
 from django_filters import CharFilter, FilterSet, NumberFilter
-from reviews.models import Title
+from reviews.models import Category, Genre, Title
+from reviews.search import filter_by_name
+
+
+def _slug_ids(model, value):
+    """Id объектов, slug которых содержит value."""
+    # Точное совпадение — частный случай подстроки: отдельный запрос по
+    # уникальному индексу slug сузил бы выборку (rock без rock-n-roll).
+    # Таблицы жанров и категорий малы, и id выбираются одним запросом,
+    # а не подзапросом к каждой строке произведений.
+    return list(
+        model.objects.filter(slug__icontains=value).order_by().values_list(
+            'pk', flat=True
+        )
+    )
 
 
 class TitleFilter(FilterSet):
-    genre = CharFilter(
-        field_name='genre__slug', lookup_expr='icontains')
-    category = CharFilter(
-        field_name='category__slug', lookup_expr='icontains')
+    genre = CharFilter(method='filter_genre')
+    category = CharFilter(method='filter_category')
     year = NumberFilter()
-    name = CharFilter(lookup_expr='icontains')
+    name = CharFilter(method='filter_name')
 
     class Meta:
         model = Title
         fields = ['genre', 'category', 'year', 'name']
+
+    def filter_genre(self, queryset, name, value):
+        titles = Title.genre.through.objects.filter(
+            genre_id__in=_slug_ids(Genre, value)
+        ).values('title_id')
+        return queryset.filter(pk__in=titles)
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category_id__in=_slug_ids(Category, value))
+
+    def filter_name(self, queryset, name, value):
+        return filter_by_name(queryset, value)
@@ -0,0 +1,14 @@
+from api.documents import rebuild_title_documents
+from django.core.management import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = 'Команда для пересборки JSON-документов произведений'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rebuilt = rebuild_title_documents()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано документов: {rebuilt}'
+        ))
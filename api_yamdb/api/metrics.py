@@ -0,0 +1,267 @@
+"""Метрики процесса в текстовом формате Prometheus.
+
+MetricsMiddleware включается настройкой METRICS и считает по маршрутам
+(имя url, например title-list или reviews-detail):
+
+* число ответов по методу и коду ответа;
+* гистограмму времени обработки;
+* число и время запросов к базе;
+* число запросов, обрабатываемых прямо сейчас.
+
+Каждый процесс gunicorn держит счётчики в памяти и не реже раза в
+METRICS_FLUSH_INTERVAL секунд записывает их в свой файл <pid>.json в
+METRICS_PATH (запись во временный файл и os.replace, читатель не видит
+половины файла). Страница /metrics складывает файлы всех процессов:
+счётчики завершившихся процессов остаются в сумме, а их незавершённые
+запросы не учитываются.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNMATCHED = 'unmatched'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class ProcessMetrics:
+    """Счётчики одного процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        self.dirty = False
+        self.in_flight = 0
+        self.requests = defaultdict(int)
+        self.durations = defaultdict(lambda: [[0] * len(BUCKETS), 0, 0])
+        self.queries = defaultdict(lambda: [0, 0])
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.dirty = True
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def finished(self, view, method, status, seconds, queries, sql):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[view, method, status] += 1
+            buckets, _, _ = duration = self.durations[view]
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+                    break
+            duration[1] += 1
+            duration[2] += seconds
+            counter = self.queries[view]
+            counter[0] += queries
+            counter[1] += sql
+            self.dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            self.dirty = False
+            return {
+                'pid': os.getpid(),
+                'in_flight': self.in_flight,
+                'requests': [
+                    [*key, count] for key, count in self.requests.items()
+                ],
+                'durations': [
+                    [view, list(buckets), count, total]
+                    for view, (buckets, count, total)
+                    in self.durations.items()
+                ],
+                'queries': [
+                    [view, *counter] for view, counter in self.queries.items()
+                ],
+            }
+
+    def flush(self, path=None):
+        path = path or settings.METRICS_PATH
+        os.makedirs(path, exist_ok=True)
+        snapshot = self.snapshot()
+        name = os.path.join(path, f'{snapshot["pid"]}.json')
+        with open(f'{name}.tmp', 'w') as stream:
+            json.dump(snapshot, stream)
+        os.replace(f'{name}.tmp', name)
+
+    def _start_flusher(self):
+        # Поток запускается в каждом процессе после fork при первом запросе.
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, daemon=True).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            if self.dirty and settings.METRICS:
+                self.flush()
+
+
+metrics = ProcessMetrics()
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        metrics.started()
+        started = time.perf_counter()
+        status = 500
+        try:
+            with connections['default'].execute_wrapper(counter):
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            match = request.resolver_match
+            metrics.finished(
+                match.url_name if match and match.url_name else UNMATCHED,
+                request.method, status, time.perf_counter() - started,
+                counter.count, counter.seconds,
+            )
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(path=None):
+    """Сумма снимков всех процессов из METRICS_PATH."""
+    path = path or settings.METRICS_PATH
+    total = {
+        'in_flight': 0,
+        'requests': defaultdict(int),
+        'durations': defaultdict(lambda: [[0] * len(BUCKETS), 0, 0]),
+        'queries': defaultdict(lambda: [0, 0]),
+    }
+    for name in os.listdir(path):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(path, name)) as stream:
+                snapshot = json.load(stream)
+        except (OSError, ValueError):
+            continue
+        if _alive(snapshot['pid']):
+            total['in_flight'] += snapshot['in_flight']
+        for *key, count in snapshot['requests']:
+            total['requests'][tuple(key)] += count
+        for view, buckets, count, seconds in snapshot['durations']:
+            duration = total['durations'][view]
+            duration[0] = [a + b for a, b in zip(duration[0], buckets)]
+            duration[1] += count
+            duration[2] += seconds
+        for view, count, seconds in snapshot['queries']:
+            total['queries'][view][0] += count
+            total['queries'][view][1] += seconds
+    return total
+
+
+def _labels(**labels):
+    return ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in labels.items()
+    )
+
+
+def _histogram(name, durations):
+    yield f'# TYPE {name} histogram'
+    for view, (buckets, count, seconds) in sorted(durations.items()):
+        cumulative = 0
+        for bound, value in zip(BUCKETS, buckets):
+            cumulative += value
+            yield (
+                f'{name}_bucket{{{_labels(view=view, le=bound)}}} '
+                f'{cumulative}'
+            )
+        yield f'{name}_bucket{{{_labels(view=view, le="+Inf")}}} {count}'
+        yield f'{name}_sum{{{_labels(view=view)}}} {seconds}'
+        yield f'{name}_count{{{_labels(view=view)}}} {count}'
+
+
+def render(total):
+    """Текст страницы /metrics."""
+    lines = [
+        '# HELP yamdb_http_requests_total Обработанные запросы.',
+        '# TYPE yamdb_http_requests_total counter',
+    ]
+    for (view, method, status), count in sorted(total['requests'].items()):
+        labels = _labels(view=view, method=method, status=status)
+        lines.append(f'yamdb_http_requests_total{{{labels}}} {count}')
+    lines.append(
+        '# HELP yamdb_http_request_duration_seconds Время обработки запроса.'
+    )
+    lines.extend(_histogram(
+        'yamdb_http_request_duration_seconds', total['durations']
+    ))
+    lines += [
+        '# HELP yamdb_db_queries_total Запросы к базе.',
+        '# TYPE yamdb_db_queries_total counter',
+    ]
+    queries = sorted(total['queries'].items())
+    for view, (count, _) in queries:
+        lines.append(
+            f'yamdb_db_queries_total{{{_labels(view=view)}}} {count}'
+        )
+    lines += [
+        '# HELP yamdb_db_query_seconds_total Время запросов к базе.',
+        '# TYPE yamdb_db_query_seconds_total counter',
+    ]
+    for view, (_, seconds) in queries:
+        lines.append(
+            f'yamdb_db_query_seconds_total{{{_labels(view=view)}}} {seconds}'
+        )
+    lines += [
+        '# HELP yamdb_http_requests_in_flight Запросы в обработке.',
+        '# TYPE yamdb_http_requests_in_flight gauge',
+        f'yamdb_http_requests_in_flight {total["in_flight"]}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    if not settings.METRICS:
+        raise Http404
+    # Свой снимок записывается сразу, чужие — по интервалу.
+    metrics.flush()
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
@@ -1,5 +1,180 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, кэширующий количество объектов больших выборок."""
+
+    def _count_cache_key(self):
+        try:
+            sql = str(self.object_list.query)
+        except (AttributeError, EmptyResultSet):
+            return None
+        digest = hashlib.md5(sql.encode()).hexdigest()
+        return f'pagination:count:{digest}'
+
+    @cached_property
+    def count(self):
+        key = self._count_cache_key()
+        if key is None:
+            return super().count
+
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            # Маленькие выборки считаются дёшево и всегда точно.
+            if count >= settings.PAGINATION_COUNT_CACHE_THRESHOLD:
+                cache.set(
+                    key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT
+                )
+        return count
+
+
+def _row_value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+def _after(ordering, values):
+    """Условие «строка идёт после values» в порядке ordering."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по курсору без COUNT и OFFSET.
+
+    Курсор хранит значения всех полей ordering у крайней строки
+    страницы, поэтому строки с одинаковым значением первого поля
+    (например, произведения с одним названием) не теряются и не
+    повторяются на соседних страницах. Последнее поле ordering должно
+    быть уникальным.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        values, reverse = self._decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(_after(ordering, values))
+
+        rows = list(queryset[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        # С курсором страница, с которой пришли, лежит с другой стороны.
+        self.has_next = values is not None if reverse else more
+        self.has_previous = more if reverse else values is not None
+        self.rows = rows
+        return rows
+
+    def _decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode()).decode())
+            values, reverse = cursor['v'], bool(cursor['r'])
+            if not isinstance(values, list):
+                raise TypeError
+            values = self._cursor_values(model, values)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def _cursor_values(self, model, values):
+        """Значения курсора, приведённые к типам полей ordering."""
+        if len(values) != len(self.ordering) or None in values:
+            raise ValueError
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(self.ordering, values)
+        ]
+
+    def _link(self, row, reverse):
+        values = [
+            _row_value(row, field.lstrip('-')) for field in self.ordering
+        ]
+        encoded = b64encode(json.dumps(
+            {'v': values, 'r': int(reverse)}, cls=DjangoJSONEncoder,
+        ).encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, encoded,
+        )
+
+    def get_next_link(self):
+        if not (self.has_next and self.rows):
+            return None
+        return self._link(self.rows[-1], False)
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.rows):
+            return None
+        return self._link(self.rows[0], True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
 
 
 class DefaultPagination(PageNumberPagination):
+    """Номера страниц по умолчанию, курсор по запросу ?cursor=.
+
+    Курсорный режим доступен вьюхам, у которых задан cursor_ordering.
+    """
+
     page_size = 20
+    django_paginator_class = CachedCountPaginator
+    cursor_query_param = 'cursor'
+    keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering and self.cursor_query_param in request.query_params:
+            self.keyset_paginator = KeysetPagination(ordering, self.page_size)
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
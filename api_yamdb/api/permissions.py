@@ -22,10 +22,15 @@ class IsAuthorAdminModerator(permissions.IsAuthenticatedOrReadOnly):
     def has_object_permission(self, request, view, obj):
         user = request.user
 
+        # Чтение разрешено всем; при чтении obj может быть строкой .values().
+        if request.method in permissions.SAFE_METHODS:
+            return True
+
         if not user.is_authenticated:
             return False
 
-        return obj.author == user or user.is_admin or user.is_moderator
+        # Сравнение id не загружает автора объекта из базы.
+        return obj.author_id == user.id or user.is_admin or user.is_moderator
 
 
 class ReadOnly(permissions.BasePermission):
@@ -6,15 +6,52 @@ from django.contrib.auth.tokens import default_token_generator
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
-from rest_framework_simplejwt.tokens import RefreshToken
 from reviews.models import Category, Comment, Genre, Review, Title
+from users.authentication import access_token_for
 
 User = get_user_model()
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """Выбор выводимых полей (fields) и раскрытие связей (expand).
+
+    Раскрываемые связи перечислены в expandable_fields: имя поля и
+    сериализатор с аргументами, которым заменяется компактное поле.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+
+        unknown = set(expand) - set(self.expandable_fields)
+        if unknown:
+            raise api_exceptions.UnknownFieldsError("expand", unknown)
+        for name in expand:
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+
+        if fields is not None:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise api_exceptions.UnknownFieldsError("fields", unknown)
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    """Раскрытый автор отзыва или комментария."""
+
+    class Meta:
+        model = User
+        fields = ("username", "first_name", "last_name", "bio")
+
+
+class CommentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор комментариев."""
 
+    expandable_fields = {"author": (AuthorSerializer, {})}
+
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field="username",
@@ -61,9 +98,7 @@ class TokenSerializer(serializers.Serializer):
         if not default_token_generator.check_token(user, code):
             raise api_exceptions.ConfirmationCodeError
 
-        refresh = RefreshToken.for_user(user)
-
-        return {"token": str(refresh.access_token)}
+        return {"token": str(access_token_for(user))}
 
 
 class SignUpSerializer(serializers.ModelSerializer):
@@ -80,7 +115,7 @@ class SignUpSerializer(serializers.ModelSerializer):
         fields = ("username", "email")
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для модели Category."""
 
     slug = serializers.SlugField(
@@ -94,7 +129,7 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для модели Genre."""
 
     slug = serializers.SlugField(
@@ -120,7 +155,7 @@ class TitleSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = "__all__"
+        exclude = ("rating_sum", "rating_count")
         model = Title
 
     def validate_year(self, value):
@@ -138,9 +173,90 @@ class TitleListSerializer(TitleSerializer):
     rating = serializers.IntegerField(read_only=True)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TitleSparseSerializer(DynamicFieldsMixin, TitleListSerializer):
+    """Произведение с выбором полей: связи выводятся slug'ами,
+    пока не раскрыты через expand."""
+
+    genre = serializers.SlugRelatedField(
+        slug_field="slug", many=True, read_only=True
+    )
+    category = serializers.SlugRelatedField(
+        slug_field="slug", read_only=True
+    )
+
+    expandable_fields = {
+        "genre": (GenreSerializer, {"many": True}),
+        "category": (CategorySerializer, {}),
+    }
+
+
+class PreloadedSlugRelatedField(serializers.SlugRelatedField):
+    """Связь по slug, объекты которой заранее загружены в контекст.
+
+    context[context_key] — словарь {slug: объект}; запросов к базе на
+    каждое значение не делается.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            return self.context[self.context_key][str(data)]
+        except KeyError:
+            self.fail(
+                "does_not_exist", slug_name=self.slug_field, value=data
+            )
+
+
+def bulk_title_id(item):
+    """Id изменяемого произведения из элемента пачки (None — создание)."""
+    if not isinstance(item, dict):
+        return None
+    return item.get("id")
+
+
+def preload_title_relations(items):
+    """Жанры, категории и изменяемые произведения пачки.
+
+    По одному запросу на модель.
+    """
+    genres, categories, titles = set(), set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if isinstance(bulk_title_id(item), int):
+            titles.add(item["id"])
+        if isinstance(item.get("genre"), list):
+            genres.update(map(str, item["genre"]))
+        if item.get("category") is not None:
+            categories.add(str(item["category"]))
+    return {
+        "genres": Genre.objects.in_bulk(genres, field_name="slug"),
+        "categories": Category.objects.in_bulk(
+            categories, field_name="slug"
+        ),
+        "titles": Title.objects.in_bulk(titles),
+    }
+
+
+class TitleBulkSerializer(TitleSerializer):
+    """Произведение из массового запроса (см. preload_title_relations)."""
+
+    genre = PreloadedSlugRelatedField(
+        "genres", slug_field="slug", many=True, queryset=Genre.objects.all()
+    )
+    category = PreloadedSlugRelatedField(
+        "categories", slug_field="slug", queryset=Category.objects.all()
+    )
+
+
+class ReviewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для модели Review."""
 
+    expandable_fields = {"author": (AuthorSerializer, {})}
+
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field="username"
@@ -155,12 +271,109 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise api_exceptions.ScoreValidationError
         return value
 
-    def validate(self, data):
-        request = self.context["request"]
-        title_id = self.context["view"].kwargs.get("title_id")
-        exists = Review.objects.filter(
-            title__id=title_id, author=request.user
-        ).exists()
-        if exists and request.method == "POST":
-            raise api_exceptions.ReviewUniqueExist
-        return data
+
+def _passthrough(value):
+    return value
+
+
+# Поля, представление которых совпадает со значением из БД.
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.SlugRelatedField,
+)
+
+
+def _compile_readers(serializer, prefix=""):
+    """Список (имя, путь в .values(), преобразование) для полей."""
+    readers = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        lookup = prefix + field.source.replace(".", "__")
+        if isinstance(field, serializers.Serializer):
+            # Раскрытая связь: вложенные поля читаются из той же строки.
+            readers.append(
+                (name, None, _compile_readers(field, f"{lookup}__"))
+            )
+            continue
+        if isinstance(field, serializers.SlugRelatedField):
+            lookup = f"{lookup}__{field.slug_field}"
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            convert = _passthrough
+        else:
+            convert = field.to_representation
+        readers.append((name, lookup, convert))
+    return readers
+
+
+def _read(row, readers):
+    data = {}
+    for name, lookup, convert in readers:
+        if lookup is None:
+            data[name] = _read(row, convert)
+        else:
+            value = row[lookup]
+            data[name] = None if value is None else convert(value)
+    return data
+
+
+def _lookups(readers):
+    for _, lookup, convert in readers:
+        if lookup is None:
+            yield from _lookups(convert)
+        else:
+            yield lookup
+
+
+class ValuesReadSerializer(serializers.BaseSerializer):
+    """Чтение строк .values() по полям обычного сериализатора.
+
+    Для каждого поля один раз вычисляются путь в .values() и функция
+    преобразования, поэтому строки не превращаются в объекты моделей,
+    а результат совпадает с выводом исходного сериализатора.
+    """
+
+    source_serializer = None
+    fieldset = {}
+    _readers = None
+
+    @classmethod
+    def compile(cls):
+        if cls._readers is None:
+            cls._readers = _compile_readers(
+                cls.source_serializer(**cls.fieldset)
+            )
+        return cls._readers
+
+    @classmethod
+    def lookups(cls):
+        return list(_lookups(cls.compile()))
+
+    def to_representation(self, row):
+        return _read(row, self.compile())
+
+
+_values_serializers = {}
+
+
+def values_serializer(serializer_class, fields=None, expand=()):
+    """Быстрый сериализатор для чтения, построенный по serializer_class.
+
+    fields и expand передаются исходному сериализатору (см.
+    DynamicFieldsMixin) и проверяются им.
+    """
+    fieldset = {}
+    key = (serializer_class, None)
+    if fields is not None or expand:
+        # Ключ из итоговых имён полей: мусор в запросе не плодит классы.
+        names = serializer_class(fields=fields, expand=expand).fields
+        fieldset = {"fields": frozenset(names), "expand": frozenset(expand)}
+        key = (serializer_class, fieldset["fields"], fieldset["expand"])
+    if key not in _values_serializers:
+        _values_serializers[key] = type(
+            f"Values{serializer_class.__name__}",
+            (ValuesReadSerializer,),
+            {"source_serializer": serializer_class, "fieldset": fieldset},
+        )
+    return _values_serializers[key]
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from .cache import invalidate
+from .documents import documents_active, rebuild_title_documents
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Title)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Comment)
+# Имя автора выводится в отзывах и комментариях.
+@receiver([post_save, post_delete], sender=get_user_model())
+def data_changed(sender, **kwargs):
+    # Каскадные удаления и изменения из админки тоже меняют версию.
+    invalidate(sender)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_invalidate(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate(Title)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, raw=False, **kwargs):
+    if documents_active() and not raw:
+        rebuild_title_documents([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not documents_active():
+        return
+    if not reverse:
+        if action.startswith('post_'):
+            rebuild_title_documents([instance.pk])
+        return
+    # Изменение со стороны жанра: genre.genres.add(...) и т.п.
+    if action == 'pre_clear':
+        instance._document_title_ids = list(
+            instance.genres.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        rebuild_title_documents(instance._document_title_ids)
+    elif action.startswith('post_'):
+        rebuild_title_documents(pk_set)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Category)
+def lookup_saved(sender, instance, raw=False, **kwargs):
+    if documents_active() and not raw:
+        rebuild_title_documents(_related_title_ids(instance))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Category)
+def lookup_deleting(sender, instance, **kwargs):
+    # После удаления связи с произведениями уже не найти.
+    if documents_active():
+        instance._document_title_ids = list(_related_title_ids(instance))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Category)
+def lookup_deleted(sender, instance, **kwargs):
+    if documents_active():
+        rebuild_title_documents(getattr(instance, '_document_title_ids', []))
+
+
+def _related_title_ids(instance):
+    if isinstance(instance, Genre):
+        titles = Title.objects.filter(genre=instance)
+    else:
+        titles = Title.objects.filter(category=instance)
+    return titles.order_by().values_list('pk', flat=True)
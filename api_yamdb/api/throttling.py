@@ -0,0 +1,197 @@
+"""Ограничение частоты запросов по алгоритму token bucket.
+
+Корзина вмещает N жетонов и пополняется со скоростью N за период
+(rate вида "5/min" в DEFAULT_THROTTLE_RATES). Состояние корзин хранится
+в хранилище, выбранном настройкой THROTTLE_STORE:
+
+* local — словарь в памяти процесса;
+* file — файлы в THROTTLE_FILE_PATH под блокировкой flock, общие для
+  процессов одной машины (их число ограничено FileBucketStore.shards);
+* cache — кэш Django, общий для всех процессов; нужен бэкенд с атомарным
+  cache.add (memcached, redis). У FileBasedCache add не атомарен, и
+  параллельные запросы проходят сверх лимита.
+
+Проверка выполняется до разбора данных сериализатором, поэтому
+отклонённый запрос не обращается к базе и не считает хэши.
+"""
+import fcntl
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+LOCK_TIMEOUT = 1
+
+
+def _take(state, now, capacity, rate):
+    """Взять жетон: новое состояние корзины и время ожидания."""
+    tokens, stamp = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Корзины в памяти процесса."""
+
+    # Полные корзины можно забыть: их состояние совпадает с начальным.
+    max_entries = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def consume(self, key, capacity, rate, now):
+        with self._lock:
+            state, wait = _take(self._buckets.get(key), now, capacity, rate)
+            self._buckets[key] = state
+            if len(self._buckets) > self.max_entries:
+                self._prune(now, capacity, rate)
+        return wait
+
+    def _prune(self, now, capacity, rate):
+        full = now - capacity / rate
+        self._buckets = {
+            key: state for key, state in self._buckets.items()
+            if state[1] > full
+        }
+
+
+class FileBucketStore:
+    """Корзины в файлах, ключи распределены по shards файлам.
+
+    Имена приходят от клиента, поэтому файл на ключ заполнил бы диск.
+    Корзина хранится, пока не успела бы наполниться: после этого её
+    состояние совпадает с начальным, и при записи файла она удаляется.
+    """
+
+    shards = 256
+
+    def __init__(self, path=None):
+        self.path = path or settings.THROTTLE_FILE_PATH
+        os.makedirs(self.path, exist_ok=True)
+
+    def consume(self, key, capacity, rate, now):
+        digest = hashlib.md5(key.encode()).hexdigest()
+        name = f'{int(digest, 16) % self.shards:02x}'
+        fd = os.open(os.path.join(self.path, name), os.O_RDWR | os.O_CREAT)
+        with os.fdopen(fd, 'r+') as shard:
+            fcntl.flock(shard, fcntl.LOCK_EX)
+            content = shard.read()
+            # Корзина: [жетоны, время, момент наполнения].
+            buckets = {
+                bucket_key: bucket
+                for bucket_key, bucket in (
+                    json.loads(content) if content else {}
+                ).items()
+                if bucket[2] > now
+            }
+            bucket = buckets.get(key)
+            state, wait = _take(
+                bucket and tuple(bucket[:2]), now, capacity, rate
+            )
+            buckets[key] = [*state, now + capacity / rate]
+            shard.seek(0)
+            shard.truncate()
+            shard.write(json.dumps(buckets))
+        return wait
+
+
+class CacheBucketStore:
+    """Корзины в кэше Django.
+
+    Чтение и запись корзины защищены блокировкой через cache.add.
+    Неиспользуемая корзина истекает, когда успела бы наполниться.
+    """
+
+    def consume(self, key, capacity, rate, now):
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                # Блокировка потеряна вместе с процессом: ждём её истечения.
+                return LOCK_TIMEOUT
+            time.sleep(0.001)
+        try:
+            state, wait = _take(cache.get(key), now, capacity, rate)
+            cache.set(key, state, int(capacity / rate) + 1)
+        finally:
+            cache.delete(lock_key)
+        return wait
+
+
+STORES = {
+    'local': LocalBucketStore,
+    'file': FileBucketStore,
+    'cache': CacheBucketStore,
+}
+_stores = {}
+
+
+def get_bucket_store(name=None):
+    """Хранилище корзин (один экземпляр на процесс)."""
+    name = name or settings.THROTTLE_STORE
+    if name not in _stores:
+        _stores[name] = STORES[name]()
+    return _stores[name]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Базовый класс: ключ корзины задаёт get_key()."""
+
+    scope = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def get_rate(self):
+        num, period = api_settings.DEFAULT_THROTTLE_RATES[self.scope].split(
+            '/'
+        )
+        seconds = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), int(num) / seconds
+
+    def allow_request(self, request, view):
+        self._wait = 0
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        capacity, rate = self.get_rate()
+        self._wait = get_bucket_store().consume(
+            f'throttle:{self.scope}:{key}', capacity, rate, time.time()
+        )
+        return not self._wait
+
+    def wait(self):
+        # Retry-After передаётся целым числом секунд.
+        return math.ceil(self._wait)
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Запросы регистрации и получения токена с одного адреса."""
+
+    scope = 'auth_ip'
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AuthUsernameThrottle(TokenBucketThrottle):
+    """Запросы регистрации и получения токена для одного имени."""
+
+    scope = 'auth_username'
+
+    def get_key(self, request, view):
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        if not isinstance(username, str) or not username:
+            return None
+        return username.lower()
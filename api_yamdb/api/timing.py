@@ -0,0 +1,160 @@
+"""Замеры времени обработки запроса.
+
+RequestTimingMiddleware включается настройкой REQUEST_TIMING и для
+каждого запроса считает:
+
+* число запросов к базе и их суммарное время (execute_wrapper на всех
+  соединениях);
+* время сериализации — вычисление serializer.data;
+* время отрисовки ответа рендерером DRF;
+* полное время обработки.
+
+Значения отдаются в заголовке Server-Timing. Запросы дольше
+REQUEST_TIMING_SLOW_MS записываются в лог api.timing одной строкой JSON
+вместе с REQUEST_TIMING_TOP_SQL самыми долгими запросами к базе.
+Время SQL входит и во время сериализации, если запрос выполнялся при
+вычислении serializer.data.
+
+Без настройки посредник отключается при запуске и ничего не стоит.
+"""
+import heapq
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestTiming:
+    """Накопленные замеры одного запроса, время в секундах."""
+
+    def __init__(self, top):
+        self.started = time.perf_counter()
+        self.top = top
+        self.queries = 0
+        self.sql = 0
+        self.serialize = 0
+        self.render = 0
+        self.slowest = []
+        self._depth = 0
+        self._render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql += elapsed
+            # Куча из top самых долгих; id() различает равные времена.
+            item = (elapsed, id(sql), sql)
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, item)
+            elif self.top:
+                heapq.heappushpop(self.slowest, item)
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.sql * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.2f}',
+            f'render;dur={self.render * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+
+    def slow_queries(self):
+        return [
+            {'ms': round(elapsed * 1000, 2), 'sql': sql}
+            for elapsed, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+def current_timing():
+    """Замеры текущего запроса или None."""
+    return getattr(_local, 'timing', None)
+
+
+def _timed_data(data):
+    def wrapper(serializer):
+        timing = current_timing()
+        if timing is None or timing._depth:
+            return data.fget(serializer)
+        timing._depth += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            timing.serialize += time.perf_counter() - started
+            timing._depth -= 1
+    wrapper.timed = True
+    return property(wrapper)
+
+
+def _install_serializer_timing():
+    # Serializer.data и ListSerializer.data вызывают BaseSerializer.data,
+    # так что одной обёртки достаточно для всех сериализаторов.
+    if not getattr(BaseSerializer.data.fget, 'timed', False):
+        BaseSerializer.data = _timed_data(BaseSerializer.data)
+
+
+class RequestTimingMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _install_serializer_timing()
+
+    def __call__(self, request):
+        timing = RequestTiming(settings.REQUEST_TIMING_TOP_SQL)
+        _local.timing = timing
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+                if timing._render_started is not None:
+                    timing.render = (
+                        time.perf_counter() - timing._render_started
+                    )
+        finally:
+            _local.timing = None
+        total = time.perf_counter() - timing.started
+        response['Server-Timing'] = timing.server_timing(total)
+        if total * 1000 >= settings.REQUEST_TIMING_SLOW_MS:
+            self.log_slow(request, response, timing, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответ DRF отрисовывается сразу после этого вызова: посредник
+        # стоит первым в MIDDLEWARE, и его process_template_response
+        # вызывается последним.
+        timing = current_timing()
+        if timing is not None:
+            timing._render_started = time.perf_counter()
+        return response
+
+    def log_slow(self, request, response, timing, total):
+        match = request.resolver_match
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'queries': timing.queries,
+            'sql_ms': round(timing.sql * 1000, 2),
+            'serialize_ms': round(timing.serialize * 1000, 2),
+            'render_ms': round(timing.render * 1000, 2),
+            'slowest_sql': timing.slow_queries(),
+        }, ensure_ascii=False))
@@ -1,22 +1,32 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import CreateAPIView, RetrieveUpdateAPIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.relations import ManyRelatedField, SlugRelatedField
 from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.authentication import get_identity, is_claims_user
+from users.outbox import enqueue_mail
 
 from api_yamdb import settings
 
-from . import pagination, serializers
+from . import documents, pagination, serializers
+from .cache import ConditionalGetMixin, ResponseCacheMixin, invalidate
+from .exceptions import BulkPayloadError, ReviewUniqueExist
 from .filters import TitleFilter
 from .permissions import IsAdmin, IsAuthorAdminModerator, ReadOnly
+from .throttling import AuthIPThrottle, AuthUsernameThrottle
 
 User = get_user_model()
 
@@ -38,11 +48,19 @@ class SelfEditApiView(RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        user = self.request.user
+        if not is_claims_user(user):
+            return user
+        if self.request.method in SAFE_METHODS:
+            return get_identity(user.pk)
+        # Строка из кэша может отставать от базы: сохранение вернуло бы
+        # поля, изменённые с тех пор (например, роль).
+        return User.objects.get(pk=user.pk)
 
 
 class GetTokenApiView(TokenObtainPairView):
     serializer_class = serializers.TokenSerializer
+    throttle_classes = [AuthIPThrottle, AuthUsernameThrottle]
 
 
 class SignUpApiView(CreateAPIView):
@@ -50,38 +68,120 @@ class SignUpApiView(CreateAPIView):
 
     serializer_class = serializers.SignUpSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthUsernameThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        code = default_token_generator.make_token(user)
-
-        mail_text = render_to_string(
-            "users/confirmation_code.txt",
-            {
-                "username": user.username,
-                "code": code,
-            },
-        )
-
-        send_mail(
-            "Ваш код подтверждения",
-            mail_text,
-            settings.FROM_EMAIL,
-            [user.email],
-        )
+        with transaction.atomic():
+            user = serializer.save()
+            code = default_token_generator.make_token(user)
+
+            mail_text = render_to_string(
+                "users/confirmation_code.txt",
+                {
+                    "username": user.username,
+                    "code": code,
+                },
+            )
+
+            # Письмо отправит команда send_emails.
+            enqueue_mail(
+                "Ваш код подтверждения",
+                mail_text,
+                settings.FROM_EMAIL,
+                [user.email],
+            )
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class BaseViewSet(viewsets.ModelViewSet):
+class DynamicFieldsViewMixin:
+    """Параметры ?fields= и ?expand= для list и retrieve.
+
+    Список полей и раскрываемых связей передаётся сериализаторам
+    с DynamicFieldsMixin.
+    """
+
+    fieldset_actions = ("list", "retrieve")
+    fieldset_params = ("fields", "expand")
+
+    def get_fieldset(self):
+        if self.action not in self.fieldset_actions:
+            return {}
+        fieldset = {}
+        for param in self.fieldset_params:
+            value = self.request.query_params.get(param)
+            if value:
+                fieldset[param] = frozenset(
+                    name.strip() for name in value.split(",") if name.strip()
+                )
+        return fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, serializers.DynamicFieldsMixin):
+            kwargs.update(self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
+
+
+class ValuesReadMixin:
+    """list и retrieve читают строки .values() без создания моделей.
+
+    Из базы выбираются только столбцы выводимых полей.
+    """
+
+    values_read_actions = ("list", "retrieve")
+
+    def _values_read(self):
+        return self.action in self.values_read_actions
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self._values_read():
+            return queryset
+        lookups = self.get_serializer_class().lookups()
+        # Курсор строится по полям сортировки, даже если их не выводят.
+        for field in getattr(self, "cursor_ordering", ()):
+            if field.lstrip("-") not in lookups:
+                lookups.append(field.lstrip("-"))
+        return queryset.values(*lookups)
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        if self._values_read():
+            return serializers.values_serializer(
+                serializer_class, **self.get_fieldset()
+            )
+        return serializer_class
+
+
+def _related_columns(field):
+    """Столбцы связанной модели, которые читает поле-связь."""
+    if isinstance(field, ManyRelatedField):
+        field = field.child_relation
+    if isinstance(field, ListSerializer):
+        field = field.child
+    if isinstance(field, SlugRelatedField):
+        return [field.slug_field]
+    return [child.source for child in field.fields.values()]
+
+
+class BaseViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    DynamicFieldsViewMixin,
+    viewsets.ModelViewSet,
+):
     """Базовая вьюха."""
     permission_classes = [IsAdmin | ReadOnly]
     pagination_class = pagination.DefaultPagination
 
 
 class ListCreateDestroyViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    DynamicFieldsViewMixin,
     viewsets.GenericViewSet,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
@@ -96,39 +196,52 @@ class ListCreateDestroyViewSet(
     filter_backends = (filters.SearchFilter,)
 
 
-class CommentViewSet(BaseViewSet):
+class CommentViewSet(ValuesReadMixin, BaseViewSet):
     """Вьюха для комментариев."""
 
     permission_classes = [IsAuthorAdminModerator | ReadOnly]
     serializer_class = serializers.CommentSerializer
+    cursor_ordering = ('-id',)
+    etag_models = (Review, Comment, User)
+
+    _review = None
 
     def _get_review(self):
-        """Получение объекта Review."""
-        title_id = self.kwargs.get("title_id")
-        review_id = self.kwargs.get("review_id")
-        return get_object_or_404(Review, pk=review_id, title__id=title_id)
+        """Получение объекта Review (один раз за запрос)."""
+        if self._review is None:
+            title_id = self.kwargs.get("title_id")
+            review_id = self.kwargs.get("review_id")
+            # Вьюхе нужен только id отзыва.
+            self._review = get_object_or_404(
+                Review.objects.only("id"), pk=review_id, title__id=title_id
+            )
+        return self._review
 
     def get_queryset(self):
         review = self._get_review()
-        return review.comments.all()
+        return review.comments.select_related("author")
 
     def perform_create(self, serializer):
         review = self._get_review()
         serializer.save(author=self.request.user, review=review)
 
 
-class CategoryViewSet(ListCreateDestroyViewSet):
+class CategoryViewSet(ValuesReadMixin, ListCreateDestroyViewSet):
     """Вьюха категорий."""
 
     queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializer
+    cache_models = (Category,)
+    etag_models = cache_models
 
 
-class GenreViewSet(ListCreateDestroyViewSet):
+class GenreViewSet(ValuesReadMixin, ListCreateDestroyViewSet):
     """Вьюха жанров."""
 
     queryset = Genre.objects.all()
     serializer_class = serializers.GenreSerializer
+    cache_models = (Genre,)
+    etag_models = cache_models
 
 
 class TitleViewSet(BaseViewSet):
@@ -136,39 +249,241 @@ class TitleViewSet(BaseViewSet):
 
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
+    cursor_ordering = ('-name', '-id')
+    cache_models = (Title, Genre, Category, Review)
+    etag_models = cache_models
 
     # Поскольку: Title QuerySet won't use Meta.ordering in
     # Django 3.1. Add .order_by('-name') to retain the current query.
     # то добавляем сортировку тут.
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).all().order_by('-name')
+    # Рейтинг хранится в самом Title (rating_sum/rating_count),
+    # поэтому агрегировать отзывы при чтении не нужно.
+    # Жанры и категория загружаются фиксированным числом запросов
+    # независимо от размера страницы.
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre').order_by('-name')
+
+    def get_queryset(self):
+        if self.action in ("list", "retrieve"):
+            if self.get_fieldset():
+                return self._sparse_queryset()
+            # Чтение идёт из готовых документов: жанры, категория и
+            # описание из таблиц не нужны.
+            return Title.objects.select_related("document").only(
+                "name", "rating_sum", "rating_count", "document__body"
+            ).order_by("-name")
+        return super().get_queryset()
+
+    def _sparse_queryset(self):
+        """Выборка только тех столбцов и связей, что попадут в ответ."""
+        queryset = Title.objects.order_by("-name")
+        columns = {"name"}
+        for name, field in self.get_serializer().fields.items():
+            if name == "rating":
+                columns.update(("rating_sum", "rating_count"))
+            elif name == "genre":
+                queryset = queryset.prefetch_related(Prefetch(
+                    "genre",
+                    queryset=Genre.objects.only(*_related_columns(field)),
+                ))
+            elif name == "category":
+                queryset = queryset.select_related("category")
+                columns.add("category")
+                columns.update(
+                    f"category__{column}"
+                    for column in _related_columns(field)
+                )
+            else:
+                columns.add(field.source)
+        return queryset.only(*columns)
 
     def get_serializer_class(self):
         if self.action in ("list", "retrieve"):
-            return serializers.TitleListSerializer
+            if self.get_fieldset():
+                return serializers.TitleSparseSerializer
+            return documents.TitleDocumentSerializer
 
         return serializers.TitleSerializer
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Создание и изменение пачки произведений.
+
+        Элемент без id создаёт произведение, элемент с id частично
+        изменяет существующее (как PATCH). Каждый элемент проверяется
+        отдельно: ошибки возвращаются по позициям, а корректные
+        элементы всё равно записываются.
+        """
+        items = request.data
+        if (
+            not isinstance(items, list)
+            or len(items) > settings.TITLES_BULK_LIMIT
+        ):
+            raise BulkPayloadError(settings.TITLES_BULK_LIMIT)
+
+        context = self.get_serializer_context()
+        context.update(serializers.preload_title_relations(items))
+        results, valid, seen = [], [], set()
+        for item in items:
+            serializer, error = self._bulk_serializer(item, context, seen)
+            if error is None and not serializer.is_valid():
+                error = serializer.errors
+            if error is None:
+                valid.append((len(results), serializer))
+                results.append(None)
+            else:
+                results.append({
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": error,
+                })
+
+        titles = self._bulk_save([serializer for _, serializer in valid])
+        prefetch_related_objects(titles, "genre")
+        for (index, serializer), title in zip(valid, titles):
+            results[index] = {
+                "status": (
+                    status.HTTP_200_OK if serializer.instance
+                    else status.HTTP_201_CREATED
+                ),
+                "data": serializers.TitleSerializer(title).data,
+            }
+
+        if not valid:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(valid) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif any(serializer.instance is None for _, serializer in valid):
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(results, status=response_status)
+
+    def _bulk_serializer(self, item, context, seen):
+        """Сериализатор элемента пачки либо ошибка по полю id."""
+        title_id = serializers.bulk_title_id(item)
+        if title_id is None:
+            return serializers.TitleBulkSerializer(
+                data=item, context=context
+            ), None
+        if title_id in seen:
+            return None, {"id": ["Произведение уже изменяется в пачке."]}
+        instance = None
+        if isinstance(title_id, int):
+            instance = context["titles"].get(title_id)
+        if instance is None:
+            return None, {"id": [f"Произведения с id={title_id} нет."]}
+        seen.add(title_id)
+        return serializers.TitleBulkSerializer(
+            instance, data=item, partial=True, context=context
+        ), None
+
+    @action(detail=False, permission_classes=[IsAdmin])
+    def export(self, request):
+        """Все произведения одним ответом в формате NDJSON.
+
+        Поддерживает фильтры списка; страницы и подсчёт не нужны.
+        """
+        return self._conditional(self._export, request)
+
+    def _export(self, request):
+        queryset = self.filter_queryset(Title.objects.all())
+        return StreamingHttpResponse(
+            documents.stream_title_documents(queryset),
+            content_type="application/x-ndjson",
+        )
 
-class ReviewViewSet(BaseViewSet):
+    @transaction.atomic
+    def _bulk_save(self, validated):
+        """Записать произведения и их жанры пачками в одной транзакции.
+
+        validated — проверенные сериализаторы пачки; возвращает
+        произведения в том же порядке.
+        """
+        titles, created, updated, fields = [], [], [], set()
+        for serializer in validated:
+            title = serializer.instance or Title()
+            for field, value in serializer.validated_data.items():
+                if field != "genre":
+                    setattr(title, field, value)
+                    fields.add(field)
+            titles.append(title)
+            (updated if serializer.instance else created).append(title)
+
+        with documents.documents_suspended():
+            if connection.features.can_return_ids_from_bulk_insert:
+                Title.objects.bulk_create(created)
+            else:
+                # Без RETURNING (SQLite) id новых строк не узнать.
+                for title in created:
+                    title.save()
+            if updated and fields:
+                Title.objects.bulk_update(updated, sorted(fields))
+            self._bulk_set_genres(titles, validated)
+        documents.rebuild_title_documents([title.pk for title in titles])
+        # bulk_create и bulk_update сигналов не посылают.
+        invalidate(Title)
+        return titles
+
+    def _bulk_set_genres(self, titles, validated):
+        """Заменить жанры произведений, для которых они переданы."""
+        through = Title.genre.through
+        replaced, rows = [], []
+        for title, serializer in zip(titles, validated):
+            if "genre" not in serializer.validated_data:
+                continue
+            if serializer.instance:
+                replaced.append(title.pk)
+            # Повторы slug в одном элементе дают один жанр, как и set().
+            genre_ids = {
+                genre.pk for genre in serializer.validated_data["genre"]
+            }
+            rows.extend(
+                through(title_id=title.pk, genre_id=genre_id)
+                for genre_id in genre_ids
+            )
+        if replaced:
+            through.objects.filter(title_id__in=replaced).delete()
+        through.objects.bulk_create(rows)
+
+
+class ReviewViewSet(ValuesReadMixin, BaseViewSet):
     """Вьюха отзывов."""
 
     permission_classes = [IsAuthorAdminModerator | ReadOnly]
     serializer_class = serializers.ReviewSerializer
+    cursor_ordering = ('-id',)
+    etag_models = (Title, Review, User)
+
+    _title = None
 
     def _get_title(self):
-        """Получить объект Title."""
-        title_id = self.kwargs.get("title_id")
-        return get_object_or_404(Title, pk=title_id)
+        """Получить объект Title (один раз за запрос)."""
+        if self._title is None:
+            self._title = get_object_or_404(
+                Title.objects.only("id"), pk=self.kwargs.get("title_id")
+            )
+        return self._title
 
     def get_queryset(self):
         title = self._get_title()
-        return title.reviews.all()
+        return title.reviews.select_related("author")
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        title = self._get_title()
-        serializer.save(
-            author=self.request.user,
-            title=title,
-        )
+        # Рейтинг обновляет сигнал post_save (reviews.signals): он же
+        # блокирует строку произведения до конца транзакции и сообщает,
+        # что произведения нет.
+        try:
+            serializer.save(
+                author=self.request.user, title_id=self.kwargs.get("title_id")
+            )
+        except Title.DoesNotExist:
+            raise NotFound
+        except IntegrityError:
+            # Повторный отзыв отсекает ограничение one_review_per_title.
+            raise ReviewUniqueExist
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 from dotenv import load_dotenv
@@ -23,20 +24,92 @@ ALLOWED_HOSTS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Ёмкость корзины и скорость её пополнения (api.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('THROTTLE_AUTH_IP', '20/min'),
+        'auth_username': os.getenv('THROTTLE_AUTH_USERNAME', '5/min'),
+    },
+    # Число прокси перед приложением (nginx): адрес клиента берётся из
+    # последней записи X-Forwarded-For, которую добавил прокси, а не из
+    # присланной клиентом. 0 — без прокси, адрес из REMOTE_ADDR.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
+# Хранилище счётчиков ограничения частоты: local, file или cache.
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', 'file')
+THROTTLE_FILE_PATH = os.getenv(
+    'THROTTLE_FILE_PATH',
+    os.path.join(tempfile.gettempdir(), 'api_yamdb_throttle'),
+)
+
+# Количество объектов выборки кэшируется, начиная с этого размера.
+PAGINATION_COUNT_CACHE_THRESHOLD = 1000
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
 }
 
+# Сколько процесс хранит строку пользователя и отметку об отзыве
+# утверждений его токенов. С общим CACHE_BACKEND отзыв действует сразу.
+IDENTITY_CACHE_TIMEOUT = 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь писем (users.outbox): размер пачки, число попыток, задержка
+# перед повтором (удваивается с каждой попыткой, не больше MAX_DELAY)
+# и время, на которое письмо закрепляется за обработчиком.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_MAX_DELAY = 3600
+EMAIL_OUTBOX_LEASE = 300
+
+# Кэш общий для всех процессов gunicorn и команд manage.py: по версиям
+# данных в нём процессы узнают о чужих изменениях (api.cache). С кэшем
+# в памяти процесса (LocMemCache) кэширование ответов и ETag отключены.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'api_yamdb_cache'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
+    }
+}
+
+# Время жизни закэшированных списков и окно, в течение которого
+# устаревший ответ отдаётся при ошибке базы данных.
+RESPONSE_CACHE_TIMEOUT = 300
+RESPONSE_CACHE_STALE_TIMEOUT = 3600
+
+# Наибольшее число произведений в одном запросе titles/bulk/.
+TITLES_BULK_LIMIT = 500
+
+# Замеры запросов (api.timing): заголовок Server-Timing и запись
+# в лог запросов дольше SLOW_MS с TOP_SQL самыми долгими запросами к базе.
+REQUEST_TIMING = os.getenv('REQUEST_TIMING', '') == '1'
+REQUEST_TIMING_SLOW_MS = int(os.getenv('REQUEST_TIMING_SLOW_MS', 500))
+REQUEST_TIMING_TOP_SQL = int(os.getenv('REQUEST_TIMING_TOP_SQL', 5))
+
+# Метрики Prometheus на /metrics (api.metrics): каждый процесс раз
+# в FLUSH_INTERVAL секунд записывает счётчики в свой файл в METRICS_PATH.
+METRICS = os.getenv('METRICS', '') == '1'
+METRICS_PATH = os.getenv('METRICS_PATH', os.path.join(BASE_DIR, 'metrics'))
+METRICS_FLUSH_INTERVAL = 1
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -55,6 +128,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.timing.RequestTimingMiddleware',
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -0,0 +1,431 @@
+"""Загрузка набора данных из csv файлов static/data.
+
+Порядок загрузки выводится из внешних ключей моделей: модели одного
+этапа не ссылаются друг на друга. Файлы разбираются и проверяются
+в отдельных процессах, разобранные строки пачками складываются во
+временный файл. Основной процесс сверяет внешние ключи каждой пачки
+с id уже записанных строк и пишет пачки в базу по этапам.
+"""
+import csv
+import datetime
+import io
+import os
+import pickle
+import time
+from collections import defaultdict, namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.color import no_style
+from django.db import connection, models
+from django.utils import timezone
+from users.authentication import revoke_deleted_identities
+
+from .models import Category, Genre, Title, TitleDocument
+
+DATA_FOLDER = os.path.join(settings.BASE_DIR, 'static', 'data')
+CHUNK_SIZE = 5000
+
+# Файлы набора данных: модель и заголовок файла.
+DATASET = {
+    'genre.csv': ('reviews.Genre', ('id', 'name', 'slug')),
+    'category.csv': ('reviews.Category', ('id', 'name', 'slug')),
+    'titles.csv': ('reviews.Title', ('id', 'name', 'year', 'category')),
+    'genre_title.csv': (
+        'reviews.Title_genre', ('id', 'title_id', 'genre_id')
+    ),
+    'users.csv': ('users.User', (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+    )),
+    'review.csv': ('reviews.Review', (
+        'id', 'title_id', 'text', 'author', 'score', 'pub_date'
+    )),
+    'comments.csv': ('reviews.Comment', (
+        'id', 'review_id', 'text', 'author', 'pub_date'
+    )),
+}
+
+TEXT_FIELDS = (models.CharField, models.TextField)
+
+Parsed = namedtuple(
+    'Parsed', ('path', 'fields', 'rows', 'spool', 'seconds')
+)
+
+
+class LoadError(Exception):
+    pass
+
+
+def get_dataset():
+    """Пары (файл, модель) набора данных"""
+    return [
+        (file, apps.get_model(label)) for file, (label, _) in DATASET.items()
+    ]
+
+
+def dependency_stages(dataset):
+    """Этапы загрузки: каждый зависит только от предыдущих"""
+    depends = {
+        model: {
+            field.related_model for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is not model
+        }
+        for _, model in dataset
+    }
+    loaded, stages = set(), []
+    while len(loaded) < len(dataset):
+        stage = [
+            (file, model) for file, model in dataset
+            if model not in loaded and depends[model] & set(depends) <= loaded
+        ]
+        if not stage:
+            raise LoadError('Циклическая зависимость между моделями')
+        loaded.update(model for _, model in stage)
+        stages.append(stage)
+    return stages
+
+
+def _is_auto_now(field):
+    return getattr(field, 'auto_now', False) or getattr(
+        field, 'auto_now_add', False
+    )
+
+
+def _copy_value(value):
+    """Значение для COPY в формате csv: пустое поле без кавычек — NULL"""
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_chunk(model, chunk):
+    """Вставка пачки через COPY (PostgreSQL)"""
+    fields = model._meta.local_concrete_fields
+    buffer = io.StringIO()
+    for obj in chunk:
+        buffer.write(','.join(
+            _copy_value(field.get_db_prep_save(
+                field.pre_save(obj, True), connection
+            ))
+            for field in fields
+        ) + '\n')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(model._meta.db_table)} ({columns}) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer,
+        )
+
+
+def existing_ids(model, ids):
+    """Какие из id есть в таблице модели"""
+    ids = list(ids)
+    # SQLite ограничивает число параметров запроса.
+    step = connection.features.max_query_params or len(ids) or 1
+    found = set()
+    for start in range(0, len(ids), step):
+        found.update(model.objects.filter(
+            pk__in=ids[start:start + step]
+        ).values_list('pk', flat=True))
+    return found
+
+
+def insert_chunk(model, chunk):
+    """Вставить пачку объектов: COPY на PostgreSQL, иначе bulk_create"""
+    if connection.vendor == 'postgresql':
+        _copy_chunk(model, chunk)
+    else:
+        model.objects.bulk_create(chunk)
+
+
+def format_value(value):
+    """Значение ячейки csv в формате файлов static/data"""
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value, timezone.utc).isoformat(
+            timespec='milliseconds'
+        ).replace('+00:00', 'Z')
+    return value
+
+
+def get_fields(model, header):
+    """Поля модели по заголовку файла"""
+    fields = []
+    for column in header:
+        name = column.strip().lower().replace(' ', '_')
+        if name.endswith('_id'):
+            name = name[:-3]
+        try:
+            fields.append(model._meta.get_field(name))
+        except FieldDoesNotExist:
+            raise LoadError(
+                f'Поле {name} не найдено в модели {model.__name__}'
+            )
+    return fields
+
+
+def export_rows(file, chunk_size=CHUNK_SIZE):
+    """Заголовок и строки файла набора данных из базы.
+
+    Строки читаются итератором по pk (на PostgreSQL — серверным
+    курсором), в памяти держится не больше chunk_size строк.
+    """
+    label, header = DATASET[file]
+    model = apps.get_model(label)
+    fields = get_fields(model, header)
+    rows = model.objects.order_by('pk').values_list(
+        *(field.attname for field in fields)
+    ).iterator(chunk_size=chunk_size)
+    return header, rows
+
+
+def _convert(field, value):
+    """Значение поля из ячейки csv"""
+    if value == '' and not isinstance(field, TEXT_FIELDS):
+        return None
+    return field.to_python(value)
+
+
+def parse_file(path, label, spool, chunk_size=CHUNK_SIZE):
+    """Разобрать csv файл в пачки значений полей.
+
+    Выполняется в процессе-исполнителе и не обращается к базе. Пачки
+    пишутся в файл spool, в памяти держится одна пачка.
+    """
+    started = time.monotonic()
+    if not os.path.exists(path):
+        raise LoadError(f'Файл {path} не найден')
+
+    model = apps.get_model(label)
+    rows = 0
+    with open(spool, 'wb') as spool_file:
+        with open(path, encoding='utf-8', newline='') as csv_file:
+            reader = csv.reader(csv_file)
+            header = next(reader, None)
+            if not header:
+                raise LoadError(f'Файл {path} пуст')
+            fields = get_fields(model, header)
+            chunk = []
+            for row in reader:
+                try:
+                    values = tuple(map(_convert, fields, row))
+                except ValidationError as e:
+                    raise LoadError(f'{path}, строка {reader.line_num}: {e}')
+                chunk.append(values)
+                if len(chunk) == chunk_size:
+                    pickle.dump(chunk, spool_file)
+                    rows += len(chunk)
+                    chunk = []
+            if chunk:
+                pickle.dump(chunk, spool_file)
+                rows += len(chunk)
+    return Parsed(
+        path, [field.attname for field in fields], rows, spool,
+        time.monotonic() - started,
+    )
+
+
+class Load():
+    """Запись разобранного файла в модель пачками.
+
+    Внешние ключи записываются по id: перед записью id каждой пачки
+    сверяются со связанной моделью запросом pk__in, так что в памяти
+    не бывает больше одной пачки id.
+    """
+
+    def __init__(self, model, parsed):
+        self.model = model
+        self.parsed = parsed
+        self.fields = [
+            model._meta.get_field(attname) for attname in parsed.fields
+        ]
+
+    def validate(self):
+        """Проверить, что внешние ключи ссылаются на записанные строки"""
+        relations = [
+            (i, field) for i, field in enumerate(self.fields)
+            if field.is_relation
+        ]
+        if not relations:
+            return
+        for rows in self._spooled():
+            for i, field in relations:
+                ids = {values[i] for values in rows} - {None}
+                missing = ids - existing_ids(field.related_model, ids)
+                if missing:
+                    raise LoadError(
+                        f'{self.parsed.path}: нет '
+                        f'{field.related_model.__name__} с id '
+                        + ', '.join(map(str, sorted(missing)[:10]))
+                    )
+
+    def _spooled(self):
+        """Пачки значений полей из файла spool"""
+        with open(self.parsed.spool, 'rb') as spool_file:
+            while True:
+                try:
+                    yield pickle.load(spool_file)
+                except EOFError:
+                    return
+
+    def _chunks(self):
+        attnames = self.parsed.fields
+        for rows in self._spooled():
+            yield [
+                self.model(**dict(zip(attnames, values)))
+                for values in rows
+            ]
+
+    def run(self):
+        """Загрузить файл, вернуть число строк"""
+        loaded = 0
+        for chunk in self._chunks():
+            insert_chunk(self.model, chunk)
+            loaded += len(chunk)
+        return loaded
+
+    def _compared(self):
+        """Поля, по которым строки сравниваются при обновлении"""
+        return [
+            field for field in self.fields
+            if not field.primary_key and not _is_auto_now(field)
+        ]
+
+    def upsert(self):
+        """Вставить новые и обновить изменённые строки по первичному ключу.
+
+        Возвращает число созданных и изменённых строк. Id строк файла
+        копятся в seen для delete_missing(), id изменённых строк — в
+        changed, значения внешних ключей до и после изменения — в
+        touched[attname].
+        """
+        if self.model._meta.pk not in self.fields:
+            raise LoadError(f'В файле {self.parsed.path} нет столбца id')
+        self.seen, self.changed = set(), set()
+        self.touched = defaultdict(set)
+        created = updated = 0
+        auto_now = [
+            field for field in self.model._meta.local_concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        for chunk in self._chunks():
+            new, changed = self._diff(chunk)
+            if new:
+                insert_chunk(self.model, new)
+            if changed:
+                now = timezone.now()
+                for obj in changed:
+                    for field in auto_now:
+                        setattr(obj, field.attname, now)
+                self.model.objects.bulk_update(changed, [
+                    field.name for field in self._compared() + auto_now
+                ])
+            created += len(new)
+            updated += len(changed)
+        return created, updated
+
+    def _diff(self, chunk):
+        """Новые и изменённые объекты пачки"""
+        names = [field.attname for field in self._compared()]
+        existing = {
+            row[0]: row[1:]
+            for row in self.model.objects.filter(
+                pk__in=[obj.pk for obj in chunk]
+            ).values_list('pk', *names)
+        }
+        relations = [
+            (i, name) for i, (field, name) in enumerate(
+                zip(self._compared(), names)
+            ) if field.is_relation
+        ]
+        new, changed = [], []
+        for obj in chunk:
+            self.seen.add(obj.pk)
+            old = existing.get(obj.pk)
+            values = tuple(getattr(obj, name) for name in names)
+            if old == values:
+                continue
+            (new if old is None else changed).append(obj)
+            self.changed.add(obj.pk)
+            for i, name in relations:
+                self.touched[name].add(values[i])
+                if old is not None:
+                    self.touched[name].add(old[i])
+        return new, changed
+
+    def delete_missing(self, chunk_size=CHUNK_SIZE):
+        """Удалить строки, которых нет в файле, вернуть их число"""
+        stale = [
+            pk for pk in self.model.objects.values_list(
+                'pk', flat=True
+            ).iterator(chunk_size=chunk_size)
+            if pk not in self.seen
+        ]
+        for start in range(0, len(stale), chunk_size):
+            self.model.objects.filter(
+                pk__in=stale[start:start + chunk_size]
+            ).delete()
+        return len(stale)
+
+
+def clear(models_list):
+    """Удалить текущие данные, начиная с зависимых таблиц"""
+    TitleDocument.objects.all().delete()
+    quote = connection.ops.quote_name
+    for model in reversed(models_list):
+        if model is apps.get_model(settings.AUTH_USER_MODEL):
+            clear_users(model)
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {quote(model._meta.db_table)}')
+
+
+def clear_users(user_model):
+    """Удалить всех пользователей и ссылающиеся на них строки.
+
+    Одним запросом на таблицу: удаление через ORM вызывает сигнал
+    и UPDATE отзыва токенов на каждого пользователя. Отзыв для новых
+    строк делает загрузка (revoke_all_identities), здесь обновляется
+    только кэш. Связи вне набора данных (журнал админки, группы)
+    удаляются или обнуляются по их on_delete.
+    """
+    quote = connection.ops.quote_name
+    user_ids = list(user_model.objects.values_list('pk', flat=True))
+    with connection.cursor() as cursor:
+        for relation in user_model._meta.get_fields(include_hidden=True):
+            if relation.concrete or relation.many_to_many:
+                continue
+            table = quote(relation.related_model._meta.db_table)
+            column = quote(relation.field.column)
+            if relation.on_delete is models.SET_NULL:
+                cursor.execute(f'UPDATE {table} SET {column} = NULL')
+            else:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE {column} IS NOT NULL'
+                )
+        cursor.execute(f'DELETE FROM {quote(user_model._meta.db_table)}')
+    revoke_deleted_identities(user_ids)
+
+
+def changed_titles(loads):
+    """Произведения, документы которых устарели после upsert"""
+    through = Title.genre.through
+    title_ids = loads[Title].changed | loads[through].touched['title_id']
+    title_ids.update(Title.objects.filter(
+        category_id__in=loads[Category].changed
+    ).values_list('pk', flat=True))
+    title_ids.update(through.objects.filter(
+        genre_id__in=loads[Genre].changed
+    ).values_list('title_id', flat=True))
+    return title_ids
+
+
+def reset_sequences(models_list):
+    """Сдвинуть счётчики id за загруженные значения"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models_list)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,68 @@
+import csv
+import gzip
+import json
+import os
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandError
+from reviews.dataset import CHUNK_SIZE, DATASET, export_rows, format_value
+
+
+def write_csv(stream, header, rows):
+    writer = csv.writer(stream, lineterminator='\n')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(map(format_value, row))
+
+
+def write_jsonl(stream, header, rows):
+    for row in rows:
+        stream.write(json.dumps(
+            dict(zip(header, map(format_value, row))), ensure_ascii=False
+        ) + '\n')
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl}
+
+
+class Command(BaseCommand):
+    help = 'Команда для выгрузки данных из Моделей в csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='Файлы для выгрузки (например, review.csv), по умолчанию все',
+        )
+        parser.add_argument(
+            '--folder', default='.', help='Папка для выгрузки',
+        )
+        parser.add_argument(
+            '--format', choices=tuple(WRITERS), default='csv',
+            help='csv — как в static/data, jsonl — объект JSON на строку',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать файлы gzip',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Число строк, читаемых из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['files']) - set(DATASET)
+        if unknown:
+            raise CommandError(
+                'Нет файлов в наборе данных: ' + ', '.join(sorted(unknown))
+            )
+        os.makedirs(options['folder'], exist_ok=True)
+        write = WRITERS[options['format']]
+        for file in options['files'] or DATASET:
+            name = os.path.splitext(file)[0] + '.' + options['format']
+            if options['gzip']:
+                name += '.gz'
+            path = os.path.join(options['folder'], name)
+            opener = gzip.open if options['gzip'] else open
+            header, rows = export_rows(file, options['chunk_size'])
+            with opener(path, 'wt', encoding='utf-8', newline='') as stream:
+                write(stream, header, rows)
+            self.stdout.write(f'Выгружен {path}')
@@ -0,0 +1,285 @@
+import csv
+import datetime
+import os
+import random
+import time
+from bisect import bisect
+from collections import defaultdict
+from itertools import accumulate
+
+from api.cache import invalidate
+from api.documents import documents_suspended, rebuild_title_documents
+from django.apps import apps
+from django.core.management import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.utils import timezone
+from reviews.dataset import (CHUNK_SIZE, DATASET, clear, dependency_stages,
+                             format_value, get_dataset, get_fields,
+                             insert_chunk, reset_sequences)
+from reviews.models import Title
+from users.authentication import revoke_all_identities
+
+WORDS = (
+    'война', 'мир', 'время', 'жизнь', 'день', 'ночь', 'город', 'дорога',
+    'море', 'небо', 'песня', 'история', 'тайна', 'сердце', 'огонь',
+    'ветер', 'звезда', 'тень', 'свет', 'дом', 'лето', 'зима', 'путь',
+    'сон', 'голос', 'книга', 'фильм', 'герой', 'финал', 'сюжет',
+    'отличный', 'скучный', 'новый', 'старый', 'долгий', 'быстрый',
+    'смешной', 'грустный', 'красивый', 'странный', 'очень', 'совсем',
+)
+START_DATE = datetime.datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def count(value):
+    """Число вида 1000 или 1e6"""
+    return int(float(value))
+
+
+class ZipfCounts:
+    """Случайные числа start, start + 1, ... с вероятностью ~ 1 / k ** s."""
+
+    def __init__(self, maximum, exponent, start=1):
+        self.start = start
+        self.cdf = list(accumulate(
+            1 / rank ** exponent for rank in range(1, maximum + 1)
+        ))
+
+    def __call__(self, rng):
+        return self.start + bisect(self.cdf, rng.random() * self.cdf[-1])
+
+
+def distribution(value, maximum, exponent, start):
+    if value == 'zipf':
+        return ZipfCounts(maximum, exponent, start)
+    fixed = min(count(value), maximum)
+    return lambda rng: fixed
+
+
+def _text(rng, shortest, longest):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(shortest, longest)))
+
+
+class DatabaseSink:
+    """Запись строк в базу пачками по batch_size."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.buffers = defaultdict(list)
+        self.models = {}
+        for file, (label, header) in DATASET.items():
+            model = apps.get_model(label)
+            self.models[file] = model, [
+                field.attname for field in get_fields(model, header)
+            ]
+
+    def write(self, file, row):
+        buffer = self.buffers[file]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(file)
+
+    def flush(self, file):
+        model, attnames = self.models[file]
+        insert_chunk(model, [
+            model(**dict(zip(attnames, row))) for row in self.buffers[file]
+        ])
+        self.buffers[file].clear()
+
+    def close(self):
+        # Пачки дописываются в порядке зависимостей моделей.
+        for stage in dependency_stages(get_dataset()):
+            for file, _ in stage:
+                if self.buffers[file]:
+                    self.flush(file)
+
+
+class CsvSink:
+    """Запись строк в csv файлы, которые читает load_data."""
+
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.streams, self.writers = [], {}
+        for file, (_, header) in DATASET.items():
+            stream = open(
+                os.path.join(folder, file), 'w', encoding='utf-8', newline=''
+            )
+            self.streams.append(stream)
+            self.writers[file] = csv.writer(stream, lineterminator='\n')
+            self.writers[file].writerow(header)
+
+    def write(self, file, row):
+        self.writers[file].writerow(map(format_value, row))
+
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+
+
+class Generator:
+    """Детерминированный набор данных: одинаковый при одном seed."""
+
+    def __init__(self, options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        # Отзыв одного автора на произведение только один:
+        # отзывов на произведение не больше, чем пользователей.
+        self.reviews_per_title = distribution(
+            options['reviews_per_title'],
+            min(options['max_reviews_per_title'], options['users']),
+            options['zipf_exponent'], start=1,
+        )
+        self.comments_per_review = distribution(
+            options['comments_per_review'],
+            options['max_comments_per_review'],
+            options['zipf_exponent'], start=0,
+        )
+        self.counts = defaultdict(int)
+
+    def run(self, sink):
+        self.sink = sink
+        self._dictionaries()
+        self._users()
+        review_id = comment_id = 0
+        for title_id in range(1, self.options['titles'] + 1):
+            self._title(title_id)
+            authors = self.rng.sample(
+                range(1, self.options['users'] + 1),
+                self.reviews_per_title(self.rng),
+            )
+            for author in authors:
+                review_id += 1
+                self._write('review.csv', (
+                    review_id, title_id, _text(self.rng, 5, 60), author,
+                    self.rng.randint(1, 10), self._date(review_id),
+                ))
+                for _ in range(self.comments_per_review(self.rng)):
+                    comment_id += 1
+                    self._write('comments.csv', (
+                        comment_id, review_id, _text(self.rng, 3, 20),
+                        self.rng.randint(1, self.options['users']),
+                        self._date(comment_id),
+                    ))
+        sink.close()
+        return self.counts
+
+    def _write(self, file, row):
+        self.sink.write(file, row)
+        self.counts[file] += 1
+
+    def _date(self, number):
+        return START_DATE + datetime.timedelta(minutes=number)
+
+    def _dictionaries(self):
+        for pk in range(1, self.options['genres'] + 1):
+            self._write('genre.csv', (pk, f'Жанр {pk}', f'genre-{pk}'))
+        for pk in range(1, self.options['categories'] + 1):
+            self._write(
+                'category.csv', (pk, f'Категория {pk}', f'category-{pk}')
+            )
+
+    def _users(self):
+        for pk in range(1, self.options['users'] + 1):
+            if pk == 1:
+                role = 'admin'
+            elif pk % 100 == 0:
+                role = 'moderator'
+            else:
+                role = 'user'
+            self._write('users.csv', (
+                pk, f'user{pk}', f'user{pk}@yamdb.fake', role, '', '', '',
+            ))
+
+    def _title(self, pk):
+        rng = self.rng
+        self._write('titles.csv', (
+            pk, _text(rng, 1, 4).capitalize(), rng.randint(1900, 2020),
+            rng.randint(1, self.options['categories']),
+        ))
+        genres = rng.sample(
+            range(1, self.options['genres'] + 1),
+            rng.randint(1, min(3, self.options['genres'])),
+        )
+        for genre in genres:
+            self._write('genre_title.csv', (
+                self.counts['genre_title.csv'] + 1, pk, genre,
+            ))
+
+
+class Command(BaseCommand):
+    help = 'Команда для генерации набора данных заданного размера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--users', type=count, default=1000)
+        parser.add_argument('--genres', type=count, default=20)
+        parser.add_argument('--categories', type=count, default=10)
+        parser.add_argument('--titles', type=count, default=1000)
+        parser.add_argument(
+            '--reviews-per-title', default='zipf',
+            help='Число отзывов на произведение или zipf',
+        )
+        parser.add_argument(
+            '--comments-per-review', default='zipf',
+            help='Число комментариев к отзыву или zipf (от нуля)',
+        )
+        parser.add_argument(
+            '--max-reviews-per-title', type=count, default=1000,
+            help='Наибольшее число отзывов на произведение',
+        )
+        parser.add_argument(
+            '--max-comments-per-review', type=count, default=10,
+            help='Наибольшее число комментариев к отзыву',
+        )
+        parser.add_argument('--zipf-exponent', type=float, default=1.2)
+        parser.add_argument(
+            '--batch-size', type=count, default=CHUNK_SIZE,
+            help='Число строк в одной вставке',
+        )
+        parser.add_argument(
+            '--csv', metavar='FOLDER',
+            help='Записать csv файлы для load_data вместо базы',
+        )
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false',
+            dest='interactive', help='Не спрашивать подтверждение',
+        )
+
+    def handle(self, *args, **options):
+        required = ('users', 'genres', 'categories')
+        if min(options[name] for name in required) < 1:
+            raise CommandError(
+                'Нужны хотя бы один пользователь, жанр и категория'
+            )
+        started = time.monotonic()
+        generator = Generator(options)
+        if options['csv']:
+            generator.run(CsvSink(options['csv']))
+        else:
+            if options['interactive'] and not self._confirm():
+                return
+            self._generate_into_database(generator, options)
+
+        for file, rows in generator.counts.items():
+            self.stdout.write(f'{file}: {rows}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.monotonic() - started:.2f} с'
+        ))
+
+    def _generate_into_database(self, generator, options):
+        models_list = [model for _, model in get_dataset()]
+        with transaction.atomic(), documents_suspended():
+            clear(models_list)
+            generator.run(DatabaseSink(options['batch_size']))
+            revoke_all_identities()
+            reset_sequences(models_list)
+            Title.objects.recalculate_rating()
+            rebuild_title_documents()
+            invalidate(*models_list)
+
+    def _confirm(self):
+        confirm = input('Все текущие данные будут удалены.'
+                        ' Создать новый набор данных? (Y/n)')
+        while confirm not in ('Y', 'n', 'yes', 'no'):
+            confirm = input('Введите "yes" or "no": ')
+        return confirm in ('Y', 'yes')
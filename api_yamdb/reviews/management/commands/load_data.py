@@ -1,193 +1,154 @@
-import csv
 import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from django.apps import apps
+from api.cache import invalidate
+from api.documents import documents_suspended, rebuild_title_documents
+from django.contrib.auth import get_user_model
 from django.core.management import BaseCommand
 from django.core.management.base import CommandError
-from django.db import models, transaction
+from django.db import transaction
+from reviews.dataset import (CHUNK_SIZE, DATA_FOLDER, Load, LoadError,
+                             changed_titles, clear, dependency_stages,
+                             get_dataset, parse_file, reset_sequences)
+from reviews.models import Review, Title
+from users.authentication import revoke_all_identities, revoke_identities
 
-
-class Load():
-    """Класс загрузчик данных из csv"""
-
-    def __init__(self, file, model_name, app='reviews',
-                 folder='/static/data/'):
-        """Конструктор"""
-        self.folder = '.' + folder
-        self.file = file
-        self.model_name = model_name
-        self.app = app
-        self.model = self._get_model_by_name()
-        self.file_data = None
-        self.file_child_data = None
-
-        self._fill_model()
-
-    def _get_file_path(self, file):
-        """Полный путь к файлу"""
-        return self.folder + file
-
-    def _get_model_by_name(self):
-        """Получить модель по имени"""
-        model = apps.get_model(self.app, self.model_name)
-
-        if not model:
-            raise Exception('Модель %s не найдена' % (model))
-
-        return model
-
-    def _get_data_from_file_csv(self, filename):
-        """Получить данные из csv файла"""
-        file = self._get_file_path(filename)
-        if not os.path.exists(file):
-            raise Exception('Файл %s не найден' % (file))
-
-        with open(file, "r", encoding="utf-8") as csv_file:
-            file_data = list(csv.reader(csv_file, delimiter=","))
-
-        if not file_data:
-            raise Exception('Файл пуст')
-
-        return file_data
-
-    def _check_field(self, field_model, field_data):
-        """Проверка поля модели на тип"""
-        type_field = self.model._meta.get_field(field_model)
-
-        if isinstance(type_field, models.ForeignKey):
-            foreign_model = (self.model._meta.get_field(
-                field_model).related_model)
-            pk = foreign_model.objects.get(id=field_data)
-            return (field_model, pk)
-
-        return (field_model, field_data)
-
-    def _get_data_from_child_file(self, id, child_field):
-        """Получение данных для подчиненного поля"""
-        data_fields = self.file_child_data[0]
-
-        for i, field_name in enumerate(data_fields):
-            data_fields[i] = field_name.lower().replace(
-                ' ', '_').replace('_id', '')
-
-        id_root_field = data_fields.index(self.model_name.lower())
-        if not id_root_field:
-            raise Exception(
-                'Не найден столбец %s_id в подчиненном файле'
-                % (self.model_name))
-
-        id_child_field = data_fields.index(child_field)
-        if not id_child_field:
-            raise Exception(
-                'Не найден столбец %s_id в подчиненном файле'
-                % (child_field))
-
-        filtered = list(
-            filter(lambda x: (x[id_root_field] == str(id)),
-                   self.file_child_data[1:]))
-
-        result = []
-
-        for filtered_row in filtered:
-            child_model = self.model._meta.get_field(
-                child_field).related_model
-            pk = child_model.objects.get(id=filtered_row[id_child_field])
-            result.append(pk)
-
-        return result
-
-    def fill_model_foregin_key(self, file_child_data, child_field):
-        """Заполнение подчиненного поля данными"""
-
-        if None in (file_child_data, child_field, self.model):
-            raise Exception(
-                'Нехватает данных для заполнения child_field - %s!'
-                ' file_child_data - %s self.model -%s'
-                % (child_field, file_child_data, self.model))
-
-        print(f'Заполняем {self.app}.{self.model_name}.{child_field} ...')
-        self.file_child_data = self._get_data_from_file_csv(file_child_data)
-        added_rows = self.model.objects.all()
-
-        for row in added_rows:
-            child_field_obj = getattr(row, child_field)
-            child_data_list = self._get_data_from_child_file(
-                row.id, child_field)
-            child_field_obj.all().delete()
-            if child_data_list:
-                child_field_obj.add(*child_data_list)
-
-        print(f'Данные {self.app}.{self.model_name}.{child_field}'
-              ' заполнены')
-
-    def _fill_model(self):
-        """Зполнение модели основная функция"""
-        file_data = self._get_data_from_file_csv(self.file)
-        model_fields = [f.name for f in self.model._meta.fields]
-        fields_name = file_data[0]
-
-        for i, field_name in enumerate(fields_name):
-            fields_name[i] = field_name.lower().replace(
-                ' ', '_').replace('_id', '')
-
-            if not fields_name[i] in model_fields:
-                raise Exception('Поле %s не найдено в модели %s' %
-                                (fields_name[i], self.model))
-
-        insert_list = []
-        print(f'Заполняем Модель {self.app}.{self.model_name} ...')
-        for row in file_data[1:]:
-            obj = self.model()
-
-            for i, field in enumerate(row):
-                fields_name[i], field = self._check_field(
-                    fields_name[i], field)
-                setattr(obj, fields_name[i], field)
-
-            insert_list.append(obj)
-
-        self.model.objects.all().delete()
-        self.model.objects.bulk_create(insert_list)
-        print(f'Модель {self.app}.{self.model_name} успешно заполнена')
+User = get_user_model()
 
 
 class Command(BaseCommand):
     help = 'Команда для загрузки данных из csv в Модели'
 
-    @transaction.atomic
-    def handle(self, *args, **options):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false',
+            dest='interactive', help='Не спрашивать подтверждение',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Число строк в одной вставке',
+        )
+        parser.add_argument(
+            '--folder', default=DATA_FOLDER, help='Папка с csv файлами',
+        )
+        parser.add_argument(
+            '--mode', choices=('replace', 'upsert'), default='replace',
+            help='replace — удалить данные и загрузить заново, '
+                 'upsert — вставить новые и обновить изменённые строки',
+        )
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='В режиме upsert удалить строки, которых нет в файлах',
+        )
+        parser.add_argument(
+            '--jobs', type=int, default=os.cpu_count(),
+            help='Число процессов для разбора файлов',
+        )
 
-        confirm = input('Вы запускаете импорт в базу данных из csv файлов.'
-                        ' Все текущие данные будут удалены.'
-                        ' Запустить импорт? (Y/n)')
-        while 1:
-            if confirm not in ('Y', 'n', 'yes', 'no'):
-                confirm = input('Введите "yes" or "no": ')
-                continue
-            if confirm in ('Y', 'yes'):
-                break
-            else:
+    def handle(self, *args, **options):
+        replace = options['mode'] == 'replace'
+        if options['interactive'] and (replace or options['delete']):
+            if not self._confirm():
                 return
 
+        started = time.monotonic()
+        stages = dependency_stages(get_dataset())
         try:
-            sid = transaction.savepoint()
-            model_obj = Load('genre.csv', 'Genre')
-            del model_obj
-            model_obj = Load('category.csv', 'Category')
-            del model_obj
-            model_obj = Load('titles.csv', 'Title')
-            model_obj.fill_model_foregin_key('genre_title.csv', 'genre')
-            del model_obj
-            model_obj = Load('users.csv', 'User', app='users')
-            del model_obj
-            model_obj = Load('review.csv', 'Review')
-            del model_obj
-            model_obj = Load('comments.csv', 'Comment')
-            del model_obj
-
-            transaction.savepoint_commit(sid)
-
-        except Exception as e:
-            transaction.savepoint_rollback(sid)
+            with tempfile.TemporaryDirectory() as spool:
+                with ProcessPoolExecutor(options['jobs']) as pool:
+                    # Все файлы разбираются сразу, запись идёт по этапам.
+                    parsing = {
+                        model: pool.submit(
+                            parse_file, os.path.join(options['folder'], file),
+                            model._meta.label, os.path.join(spool, file),
+                            options['chunk_size'],
+                        )
+                        for stage in stages for file, model in stage
+                    }
+                    with transaction.atomic(), documents_suspended():
+                        self._load(stages, parsing, replace, options['delete'])
+        except (LoadError, ValueError) as e:
             self.stdout.write(self.style.ERROR('ERROR'))
             raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные загружены за {time.monotonic() - started:.2f} с'
+        ))
+
+    def _load(self, stages, parsing, replace, delete):
+        models_list = [model for stage in stages for _, model in stage]
+        if replace:
+            clear(models_list)
+        loads = {}
+        for number, stage in enumerate(stages, 1):
+            started = time.monotonic()
+            for _, model in stage:
+                loads[model] = self._load_model(
+                    model, parsing[model].result(), replace
+                )
+            self.stdout.write(
+                f'Этап {number} ('
+                + ', '.join(model.__name__ for _, model in stage)
+                + f'): {time.monotonic() - started:.2f} с'
+            )
+        started = time.monotonic()
+        if replace:
+            Title.objects.recalculate_rating()
+            rebuild_title_documents()
+        else:
+            self._refresh(loads, delete)
+        reset_sequences(models_list)
+        invalidate(*models_list)
+        self.stdout.write(
+            f'Рейтинги и документы: {time.monotonic() - started:.2f} с'
+        )
+
+    def _load_model(self, model, parsed, replace):
+        load = Load(model, parsed)
+        started = time.monotonic()
+        load.validate()
+        validated = time.monotonic()
+        if replace:
+            summary = f'загружено строк {load.run()}'
+        else:
+            summary = 'создано {}, изменено {}'.format(*load.upsert())
+        if model is User:
+            # Строки записаны в обход сигналов: утверждения уже
+            # выданных токенов могут не совпадать с ними.
+            if replace:
+                revoke_all_identities()
+            else:
+                revoke_identities(sorted(load.changed))
+        self.stdout.write(
+            f'{model._meta.label}: {summary}; '
+            f'разбор {parsed.seconds:.2f} с, '
+            f'проверка {validated - started:.2f} с, '
+            f'запись {time.monotonic() - validated:.2f} с'
+        )
+        return load
+
+    def _refresh(self, loads, delete):
+        deleted = 0
+        if delete:
+            for model, load in reversed(list(loads.items())):
+                count = load.delete_missing()
+                deleted += count
+                self.stdout.write(f'{model._meta.label}: удалено {count}')
+        if deleted:
+            # Удаление каскадно задевает отзывы и связи: пересчёт целиком.
+            Title.objects.recalculate_rating()
+            rebuild_title_documents()
+            return
+        Title.objects.filter(
+            pk__in=loads[Review].touched['title_id']
+        ).recalculate_rating()
+        rebuild_title_documents(sorted(changed_titles(loads)))
+
+    def _confirm(self):
+        confirm = input('Вы запускаете импорт в базу данных из csv файлов.'
+                        ' Все текущие данные будут удалены.'
+                        ' Запустить импорт? (Y/n)')
+        while confirm not in ('Y', 'n', 'yes', 'no'):
+            confirm = input('Введите "yes" or "no": ')
+        return confirm in ('Y', 'yes')
@@ -0,0 +1,14 @@
+from api.cache import invalidate
+from django.core.management import BaseCommand
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Команда для пересчёта рейтингов произведений по отзывам'
+
+    def handle(self, *args, **options):
+        updated = Title.objects.recalculate_rating()
+        invalidate(Title)
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан для {updated} произведений'
+        ))
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleDocument',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='reviews.Title')),
+                ('body', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Документ произведения',
+                'verbose_name_plural': 'Документы произведений',
+            },
+        ),
+    ]
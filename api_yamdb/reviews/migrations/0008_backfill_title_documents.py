@@ -0,0 +1,56 @@
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def _lookup(obj):
+    if obj is None:
+        return None
+    return {'name': obj.name, 'slug': obj.slug}
+
+
+def _render(title):
+    # Формат TitleListSerializer на момент миграции; после изменений
+    # сериализатора документы пересобирает rebuild_title_documents.
+    return {
+        'id': title.pk,
+        'genre': [_lookup(genre) for genre in title.genre.all()],
+        'category': _lookup(title.category),
+        'rating': None,
+        'name': title.name,
+        'year': title.year,
+        'description': title.description,
+    }
+
+
+def backfill(apps, schema_editor):
+    """Создать документы произведений, у которых их ещё нет."""
+    Title = apps.get_model('reviews', 'Title')
+    TitleDocument = apps.get_model('reviews', 'TitleDocument')
+    title_ids = list(Title.objects.filter(
+        document__isnull=True
+    ).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(title_ids), BATCH_SIZE):
+        titles = Title.objects.select_related('category').prefetch_related(
+            'genre'
+        ).filter(pk__in=title_ids[start:start + BATCH_SIZE]).order_by()
+        TitleDocument.objects.bulk_create(
+            TitleDocument(
+                title_id=title.pk,
+                body=json.dumps(_render(title), ensure_ascii=False),
+            )
+            for title in titles
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:26
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_backfill_title_documents'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='category',
+            name='modified',
+        ),
+        migrations.RemoveField(
+            model_name='genre',
+            name='modified',
+        ),
+        migrations.RemoveField(
+            model_name='title',
+            name='modified',
+        ),
+    ]
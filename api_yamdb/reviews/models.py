@@ -2,8 +2,10 @@ from django.contrib.auth import get_user_model
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 
-from.validators import validate_year
+from .validators import validate_year
 
 User = get_user_model()
 
@@ -32,6 +34,34 @@ class Genre(models.Model):
         verbose_name = "Жанр"
         verbose_name_plural = "Жанры"
         ordering = ['-name']
+        indexes = [
+            models.Index(fields=['-name'], name='genre_name_desc_idx'),
+        ]
+
+
+class TitleQuerySet(models.QuerySet):
+    """Запросы к произведениям."""
+
+    def change_rating(self, score, count):
+        """Изменить накопленные сумму и количество оценок."""
+        return self.update(
+            rating_sum=F('rating_sum') + score,
+            rating_count=F('rating_count') + count,
+        )
+
+    def recalculate_rating(self):
+        """Пересчитать сумму и количество оценок по отзывам."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total')
+            ), 0),
+            rating_count=Coalesce(Subquery(
+                reviews.annotate(total=Count('pk')).values('total')
+            ), 0),
+        )
 
 
 class Title(models.Model):
@@ -47,18 +77,60 @@ class Title(models.Model):
         null=True,
         related_name='category'
     )
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Произведение"
         verbose_name_plural = "Произведения"
         ordering = ['-name']
+        # Список сортируется по -name (курсор — по -name, -id),
+        # в том числе с фильтром по году.
+        indexes = [
+            models.Index(fields=['-name', '-id'], name='title_name_desc_idx'),
+            models.Index(
+                fields=['year', '-name', '-id'], name='title_year_name_idx'
+            ),
+        ]
+
+    @property
+    def rating(self):
+        """Средняя оценка произведения."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum // self.rating_count
+
+
+class TitleDocument(models.Model):
+    """Готовое JSON-представление произведения для чтения через API."""
+
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document'
+    )
+    body = models.TextField()
+
+    class Meta:
+        verbose_name = "Документ произведения"
+        verbose_name_plural = "Документы произведений"
 
 
 class Review(models.Model):
+    """Отзыв; рейтинг произведения обновляют сигналы (reviews.signals)."""
+
+    # Произведение и оценка на момент чтения из базы.
+    _rating_state = None
+
+    # Отдельный индекс по title_id не нужен: его заменяет составной.
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
-        related_name='reviews'
+        related_name='reviews',
+        db_index=False,
     )
     text = models.TextField()
     author = models.ForeignKey(
@@ -78,6 +150,10 @@ class Review(models.Model):
         verbose_name = "Обзор"
         verbose_name_plural = "Обзоры"
         ordering = ['-id']
+        # Отзывы читаются как title.reviews.all() по -id.
+        indexes = [
+            models.Index(fields=['title', '-id'], name='review_title_id_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'title'],
@@ -85,12 +161,20 @@ class Review(models.Model):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'title_id', 'score'} <= set(field_names):
+            instance._rating_state = (instance.title_id, instance.score)
+        return instance
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
-        related_name='comments'
+        related_name='comments',
+        db_index=False,
     )
     text = models.TextField()
     author = models.ForeignKey(
@@ -104,3 +188,8 @@ class Comment(models.Model):
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['review', '-id'], name='comment_review_id_idx'
+            ),
+        ]
@@ -0,0 +1,114 @@
+"""Индексированный поиск произведений по подстроке названия.
+
+PostgreSQL: ILIKE по триграммному GIN-индексу (расширение pg_trgm).
+SQLite: FTS5-таблица с токенизатором trigram, которую поддерживают
+триггеры на reviews_title. Остальные СУБД используют обычный icontains.
+"""
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+from django.db.models.lookups import PatternLookup
+
+TRIGRAM_INDEX = 'reviews_title_name_trgm'
+FTS_TABLE = 'reviews_title_fts'
+FTS_TRIGGERS = ('ai', 'ad', 'au')
+# Токенизатор trigram не находит подстроки короче трёх символов.
+FTS_MIN_LENGTH = 3
+
+SQLITE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, content='reviews_title', content_rowid='id', "
+    "tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    "AFTER INSERT ON reviews_title BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    "AFTER DELETE ON reviews_title BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    "AFTER UPDATE OF name ON reviews_title BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+
+@models.CharField.register_lookup
+class TrigramContains(PatternLookup):
+    """Поиск подстроки без учёта регистра через ILIKE (PostgreSQL)."""
+
+    lookup_name = 'trigram_contains'
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        params.extend(rhs_params)
+        return f'{lhs_sql} ILIKE {rhs_sql}', params
+
+
+def _fts_phrase(value):
+    """Экранировать строку как фразу запроса FTS5."""
+    return '"%s"' % value.replace('"', '""')
+
+
+def _sqlite_triggers_installed(cursor):
+    triggers = [f'{FTS_TABLE}_{suffix}' for suffix in FTS_TRIGGERS]
+    cursor.execute(
+        "SELECT count(*) FROM sqlite_master "
+        "WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+        triggers,
+    )
+    return cursor.fetchone()[0] == len(triggers)
+
+
+def install_search_index(connection):
+    """Создать поисковый индекс по названиям произведений.
+
+    Операция идемпотентна. SQLite пересоздаёт reviews_title при
+    изменении схемы и теряет триггеры, поэтому для него она
+    повторяется после каждой миграции.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} '
+                'ON reviews_title USING gin (name gin_trgm_ops)'
+            )
+        elif connection.vendor == 'sqlite':
+            if _sqlite_triggers_installed(cursor):
+                return
+            for sql in SQLITE_FTS_SQL:
+                cursor.execute(sql)
+
+
+def install_search_index_after_migrate(using, **kwargs):
+    """Обработчик post_migrate: восстановить индекс после миграций."""
+    connection = connections[using]
+    if 'reviews_title' in connection.introspection.table_names():
+        install_search_index(connection)
+
+
+def uninstall_search_index(connection):
+    """Удалить поисковый индекс по названиям произведений."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+        elif connection.vendor == 'sqlite':
+            for suffix in FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def filter_by_name(queryset, value):
+    """Отфильтровать произведения по подстроке названия."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return queryset.filter(name__trigram_contains=value)
+    if vendor == 'sqlite' and len(value) >= FTS_MIN_LENGTH:
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [_fts_phrase(value)],
+        ))
+    return queryset.filter(name__icontains=value)
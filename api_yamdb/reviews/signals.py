@@ -0,0 +1,50 @@
+"""Накопленный рейтинг произведений.
+
+Сумма и количество оценок в Title меняются при каждом сохранении и
+удалении отзыва, в том числе каскадном (удаление пользователя или
+произведения) и из админки. bulk_create, bulk_update и сырой SQL
+сигналов не посылают: после них нужен recalculate_rating.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Review, Title
+
+
+@receiver(pre_save, sender=Review)
+def review_changing(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance._rating_state:
+        return
+    # Отзыв создан не из базы или без нужных полей: прежняя оценка
+    # читается отдельно.
+    instance._rating_state = Review.objects.filter(
+        pk=instance.pk
+    ).values_list('title_id', 'score').first()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._rating_state
+    new = (instance.title_id, instance.score)
+    instance._rating_state = new
+    if old == new:
+        return
+    if old is not None and old[0] == new[0]:
+        Title.objects.filter(pk=new[0]).change_rating(new[1] - old[1], 0)
+        return
+    if old is not None:
+        Title.objects.filter(pk=old[0]).change_rating(-old[1], -1)
+    updated = Title.objects.filter(pk=new[0]).change_rating(new[1], 1)
+    if created and not updated:
+        # Внешний ключ проверяется только при фиксации транзакции,
+        # а произведения уже нет.
+        raise Title.DoesNotExist
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    Title.objects.filter(pk=instance.title_id).change_rating(
+        -instance.score, -1
+    )
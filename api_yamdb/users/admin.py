@@ -1,6 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import User
+from .models import OutboxEmail, User
 
 admin.site.register(User, UserAdmin)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("to", "subject", "created", "attempts", "sent_at")
+    list_filter = ("sent_at",)
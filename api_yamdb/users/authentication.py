@@ -0,0 +1,191 @@
+"""Аутентификация по JWT без чтения пользователя из базы.
+
+В токен при выдаче записываются username, role и is_superuser. По ним
+собирается объект User, которого достаточно для проверки прав и
+указания автора. Смена роли или имени и удаление отзывают утверждения
+уже выданных токенов: момент отзыва хранится в User.claims_revoked_at
+и кэшируется, так что база читается не чаще раза в
+IDENTITY_CACHE_TIMEOUT на пользователя и процесс. Для отозванных
+токенов полная строка пользователя берётся из того же кэша.
+
+С кэшем в памяти процесса отзыв запаздывает: другие процессы доверяют
+старым утверждениям, пока у них не истечёт IDENTITY_CACHE_TIMEOUT.
+С общим CACHE_BACKEND отзыв действует сразу.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+IDENTITY_KEY = 'users:identity:{}'
+REVOKED_KEY = 'users:revoked:{}'
+CLAIMS = ('username', 'role', 'is_superuser')
+REVOKE_BATCH_SIZE = 500
+
+
+def access_token_for(user):
+    """Access-токен с утверждениями, нужными для проверки прав."""
+    refresh = RefreshToken.for_user(user)
+    for claim in CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return refresh.access_token
+
+
+class ClaimsUserSaveError(Exception):
+    """Попытка сохранить пользователя, собранного из токена."""
+
+
+def _save_claims_user(*args, **kwargs):
+    raise ClaimsUserSaveError(
+        'Пользователь собран из утверждений токена и заполнен не полностью: '
+        'сохранение затёрло бы остальные поля. Сохраняйте строку '
+        'из get_identity(user.pk).'
+    )
+
+
+def user_from_claims(token):
+    """Пользователь из утверждений токена, без запроса к базе.
+
+    Утверждения могут отставать от базы на IDENTITY_CACHE_TIMEOUT
+    (см. описание модуля). save() вызывает ClaimsUserSaveError.
+    """
+    user = User(
+        id=token[api_settings.USER_ID_CLAIM],
+        **{claim: token[claim] for claim in CLAIMS}
+    )
+    # Строка с этим id уже есть: объект можно указывать в связях.
+    user._state.adding = False
+    user.from_claims = True
+    user.save = _save_claims_user
+    return user
+
+
+def is_claims_user(user):
+    return getattr(user, 'from_claims', False)
+
+
+def get_identity(user_id):
+    """Полная строка пользователя через кэш."""
+    key = IDENTITY_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.get(pk=user_id)
+        cache.set(key, user, settings.IDENTITY_CACHE_TIMEOUT)
+    return user
+
+
+def forget_identity(user_id):
+    """Убрать строку пользователя из кэша после её изменения."""
+    cache.delete(IDENTITY_KEY.format(user_id))
+
+
+def revoke_identity(user_id):
+    """Не доверять утверждениям токенов, выданных до этого момента."""
+    revoke_identities([user_id])
+
+
+def revoke_identities(user_ids):
+    """revoke_identity() для многих пользователей, пачками.
+
+    Нужна там, где пользователи пишутся в обход сигналов: bulk_update,
+    bulk_create, COPY.
+    """
+    now = timezone.now()
+    for batch in _batches(user_ids):
+        User.objects.filter(pk__in=batch).update(claims_revoked_at=now)
+        _revoke_cached(batch, now)
+
+
+def revoke_deleted_identities(user_ids):
+    """Отметить в кэше отзыв для пользователей, удалённых без сигналов.
+
+    Строк уже нет, поэтому обновляется только кэш: иначе новые
+    пользователи с теми же id получили бы старые строки и отметки.
+    """
+    now = timezone.now()
+    for batch in _batches(user_ids):
+        _revoke_cached(batch, now)
+
+
+def revoke_all_identities():
+    """Отозвать утверждения токенов всех пользователей.
+
+    Для замены всей таблицы: старые строки удаляет одним запросом
+    reviews.dataset.clear(), обновляя их отметки в кэше.
+    """
+    User.objects.update(claims_revoked_at=timezone.now())
+
+
+def _batches(user_ids):
+    user_ids = iter(user_ids)
+    batch = list(islice(user_ids, REVOKE_BATCH_SIZE))
+    while batch:
+        yield batch
+        batch = list(islice(user_ids, REVOKE_BATCH_SIZE))
+
+
+def _revoke_cached(user_ids, now):
+    cache.delete_many([IDENTITY_KEY.format(pk) for pk in user_ids])
+    cache.set_many(
+        {REVOKED_KEY.format(pk): int(now.timestamp()) for pk in user_ids},
+        settings.IDENTITY_CACHE_TIMEOUT,
+    )
+
+
+def _revoked_at(user_id):
+    """Момент отзыва утверждений (unix time), 0 — не отзывались."""
+    key = REVOKED_KEY.format(user_id)
+    revoked_at = cache.get(key)
+    if revoked_at is None:
+        row = User.objects.filter(pk=user_id).values_list(
+            'claims_revoked_at'
+        ).first()
+        if row is None:
+            # Пользователь удалён: утверждениям не доверяем.
+            revoked_at = float('inf')
+        elif row[0] is None:
+            revoked_at = 0
+        else:
+            revoked_at = int(row[0].timestamp())
+        cache.set(key, revoked_at, settings.IDENTITY_CACHE_TIMEOUT)
+    return revoked_at
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация по утверждениям токена."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            raise InvalidToken(
+                'Token contained no recognizable user identification'
+            )
+
+        if self._claims_trusted(user_id, validated_token):
+            return user_from_claims(validated_token)
+
+        try:
+            user = get_identity(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(
+                'User not found', code='user_not_found'
+            )
+        if not user.is_active:
+            raise AuthenticationFailed(
+                'User is inactive', code='user_inactive'
+            )
+        return user
+
+    def _claims_trusted(self, user_id, token):
+        if any(claim not in token for claim in CLAIMS):
+            return False
+        return token['iat'] > _revoked_at(user_id)
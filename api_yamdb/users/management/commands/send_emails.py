@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management import BaseCommand
+from users.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Команда для отправки писем из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Сколько писем забирать из очереди за раз',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Отправить накопившиеся письма и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        connection.open()
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = deliver_batch(
+                    connection, options['batch_size']
+                )
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено писем: {total_sent}, с ошибкой: {total_failed}'
+        ))
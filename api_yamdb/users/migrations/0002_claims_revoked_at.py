@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='claims_revoked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
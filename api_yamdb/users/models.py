@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.utils import timezone
 
 
 class UserRole:
@@ -63,6 +64,33 @@ class User(AbstractUser):
         choices=ROLES,
         default=UserRole.USER
     )
+    # Токены, выданные раньше, не подтверждают роль и имя пользователя.
+    claims_revoked_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-id"]
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.EmailField(max_length=254)
+    created = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Письмо"
+        verbose_name_plural = "Исходящие письма"
+        ordering = ["next_attempt_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["sent_at", "next_attempt_at"],
+                name="outbox_pending_idx",
+            ),
+        ]
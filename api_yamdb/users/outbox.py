@@ -0,0 +1,108 @@
+"""Очередь исходящих писем.
+
+Запросы только записывают письма в таблицу OutboxEmail, а отправляет
+их команда send_emails пачками через одно соединение с почтовым
+сервером. Неудачные отправки повторяются с растущей задержкой.
+"""
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """Поставить письмо в очередь; аргументы как у send_mail."""
+    OutboxEmail.objects.bulk_create(
+        OutboxEmail(
+            subject=subject, body=message, from_email=from_email, to=to
+        )
+        for to in recipient_list
+    )
+
+
+def pending_emails():
+    return OutboxEmail.objects.filter(
+        sent_at__isnull=True,
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    )
+
+
+def _claim_batch(batch_size):
+    """Забрать пачку писем, отложив их для других обработчиков."""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            pending_emails().select_for_update(skip_locked=True).filter(
+                next_attempt_at__lte=now
+            )[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[e.pk for e in emails]).update(
+            next_attempt_at=now + timedelta(
+                seconds=settings.EMAIL_OUTBOX_LEASE
+            )
+        )
+    return emails
+
+
+def _retry_delay(attempts):
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_DELAY))
+
+
+def _reconnect(connection):
+    """Открыть соединение заново; False, если сервер недоступен."""
+    try:
+        connection.close()
+        connection.open()
+    except (smtplib.SMTPException, OSError):
+        return False
+    return True
+
+
+def _record(sent, failed):
+    now = timezone.now()
+    OutboxEmail.objects.filter(pk__in=sent).update(sent_at=now)
+    for email, error in failed:
+        email.attempts += 1
+        email.next_attempt_at = now + _retry_delay(email.attempts)
+        email.last_error = str(error)
+        email.save(
+            update_fields=["attempts", "next_attempt_at", "last_error"]
+        )
+
+
+def deliver_batch(connection, batch_size):
+    """Отправить пачку писем через открытое соединение.
+
+    Возвращает количество отправленных и неудачных писем. Результаты
+    записываются и тогда, когда отправку прервало исключение: уже
+    отправленные письма не уйдут повторно.
+    """
+    sent, failed = [], []
+    try:
+        for email in _claim_batch(batch_size):
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, [email.to],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                # Любая ошибка письма (в том числе в заголовках) считается
+                # попыткой, иначе оно повторялось бы без ограничений.
+                failed.append((email, error))
+                # Соединение могло оборваться: следующее письмо идёт
+                # по новому. Если сервер недоступен, остаток пачки
+                # вернётся в очередь по истечении EMAIL_OUTBOX_LEASE.
+                if not _reconnect(connection):
+                    break
+            else:
+                sent.append(email.pk)
+    finally:
+        _record(sent, failed)
+    return len(sent), len(failed)
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import CLAIMS, forget_identity, revoke_identity
+from .models import User
+
+# Поля, при изменении которых утверждения старых токенов неверны.
+IDENTITY_FIELDS = CLAIMS + ('is_active',)
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, raw=False, **kwargs):
+    instance._identity_changed = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    old = User.objects.filter(pk=instance.pk).values(*IDENTITY_FIELDS).first()
+    instance._identity_changed = old is not None and any(
+        old[field] != getattr(instance, field) for field in IDENTITY_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    if getattr(instance, '_identity_changed', False):
+        revoke_identity(instance.pk)
+    else:
+        forget_identity(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_identity(instance.pk)
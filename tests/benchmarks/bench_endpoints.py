@@ -0,0 +1,349 @@
+"""Задержка и запросы к базе для маршрутов api/urls.py.
+
+Запуск из корня репозитория:
+
+    python tests/benchmarks/bench_endpoints.py [--scale 1 10] [--repeat 50]
+    python tests/benchmarks/bench_endpoints.py --update
+
+Для каждого коэффициента масштаба создаётся тестовая база (SQLite в
+памяти, с ключом --postgres — test_<DB_NAME> на сервере из .env),
+наполняется данными и каждый маршрут вызывается --repeat раз тестовым
+клиентом Django в том же процессе. Для маршрута записываются p50, p95
+и p99 задержки, число запросов и время SQL на запрос.
+
+Результат сравнивается с базовой линией (--baseline): маршрут считается
+замедлившимся, если задержки из --gate (по умолчанию p50; хвосты на
+общих машинах шумят) выросли больше чем на --tolerance и ещё на
+--slack-ms, или если выросло число запросов. При регрессии команда
+завершается с кодом 1. Ключ --update записывает текущий результат как
+базовую линию; задержки зависят от машины, поэтому линию стоит
+пересобирать там же, где идёт сравнение.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+# Лимиты регистрации и токена не должны мешать замерам.
+os.environ['THROTTLE_AUTH_IP'] = '1000000/s'
+os.environ['THROTTLE_AUTH_USERNAME'] = '1000000/s'
+os.environ['THROTTLE_STORE'] = 'local'
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+PERCENTILES = (50, 95, 99)
+
+
+def seed(scale):
+    """Данные масштаба scale: 200 * scale произведений, по 5 отзывов."""
+    from api.documents import rebuild_title_documents
+    from django.contrib.auth import get_user_model
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    User = get_user_model()
+    Category.objects.bulk_create(
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(5)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(10)
+    )
+    categories = list(Category.objects.order_by('pk'))
+    genres = list(Genre.objects.order_by('pk'))
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(20 * scale)
+    )
+    users = list(User.objects.order_by('pk'))
+
+    Title.objects.bulk_create(
+        Title(
+            name=f'Произведение {i}', year=1900 + i % 120,
+            category=categories[i % len(categories)],
+        )
+        for i in range(200 * scale)
+    )
+    titles = list(Title.objects.order_by('pk'))
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title=title, genre=genres[(i + shift) % 10])
+        for i, title in enumerate(titles) for shift in (0, 1)
+    )
+    Review.objects.bulk_create(
+        Review(
+            title=title, author=users[(i + shift) % len(users)],
+            text=f'Отзыв {i}-{shift}', score=(i + shift) % 10 + 1,
+        )
+        for i, title in enumerate(titles) for shift in range(5)
+    )
+    reviews = list(Review.objects.order_by('pk'))
+    Comment.objects.bulk_create(
+        Comment(
+            review=review, author=users[(i + shift) % len(users)],
+            text=f'Комментарий {i}-{shift}',
+        )
+        for i, review in enumerate(reviews) for shift in range(2)
+    )
+    Title.objects.recalculate_rating()
+    rebuild_title_documents()
+
+    return {
+        'admin': User.objects.create_user(
+            username='bench-admin', email='admin@yamdb.fake', role='admin'
+        ),
+        'user': users[0],
+        'titles': titles,
+        'review': reviews[0],
+        'comment': reviews[0].comments.order_by('pk').first(),
+        'genres': genres,
+        'category': categories[0],
+    }
+
+
+def routes(data):
+    """Маршруты: (имя, метод, kwargs, данные i-го запроса, от админа).
+
+    kwargs может быть функцией номера запроса.
+    """
+    from django.contrib.auth.tokens import default_token_generator
+
+    user, review = data['user'], data['review']
+    title_kwargs = {'title_id': review.title_id}
+    review_kwargs = {**title_kwargs, 'review_id': review.pk}
+    code = default_token_generator.make_token(user)
+
+    def bulk_item(i):
+        return [
+            {
+                'name': f'Пачка {i}-{j}', 'year': 2000,
+                'genre': [genre.slug for genre in data['genres'][:2]],
+                'category': data['category'].slug,
+            }
+            for j in range(10)
+        ]
+
+    return [
+        ('signup', 'post', None, lambda i: {
+            'username': f'bench{i}', 'email': f'bench{i}@yamdb.fake',
+        }, False),
+        ('token', 'post', None, lambda i: {
+            'username': user.username, 'confirmation_code': code,
+        }, False),
+        ('self_edit', 'get', None, None, True),
+        ('user-list', 'get', None, None, True),
+        ('user-detail', 'get', {'username': user.username}, None, True),
+        ('category-list', 'get', None, None, False),
+        ('genre-list', 'get', None, None, False),
+        ('title-list', 'get', None, None, True),
+        ('title-detail', 'get', {'pk': review.title_id}, None, True),
+        ('title-export', 'get', None, None, True),
+        ('title-bulk', 'post', None, bulk_item, True),
+        ('reviews-list', 'get', title_kwargs, None, True),
+        # Отзыв на произведение можно оставить только один раз.
+        ('reviews-list', 'post', lambda i: {
+            'title_id': data['titles'][i + 1].pk,
+        }, lambda i: {'text': 'Отзыв администратора', 'score': 5}, True),
+        ('reviews-detail', 'get', {**title_kwargs, 'pk': review.pk}, None,
+         True),
+        ('comments-list', 'get', review_kwargs, None, True),
+        ('comments-list', 'post', review_kwargs, lambda i: {
+            'text': f'Комментарий администратора {i}',
+        }, True),
+        ('comments-detail', 'get', {
+            **review_kwargs, 'pk': data['comment'].pk,
+        }, None, True),
+    ]
+
+
+def percentile(values, percent):
+    """Значение по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+class QueryTimer:
+    """Число и суммарное время запросов через execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def measure(client, method, url_for, payload, repeat):
+    """Задержки (мс), запросы и время SQL (мс) на запрос."""
+    from django.db import connection
+
+    latencies, queries, sql_time = [], [], []
+    gc.collect()
+    # Первый запрос прогревает кэши и не учитывается.
+    for i in range(-1, repeat):
+        target = url_for(i)
+        data = payload(i) if payload else None
+        timer = QueryTimer()
+        gc.disable()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            response = getattr(client, method)(target, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        gc.enable()
+        if response.status_code >= 400:
+            sys.exit(f'{method.upper()} {target}: {response.status_code}')
+        if i < 0:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(timer.count)
+        sql_time.append(timer.seconds * 1000)
+
+    result = {
+        f'p{percent}': round(percentile(latencies, percent), 3)
+        for percent in PERCENTILES
+    }
+    result['queries'] = percentile(queries, 50)
+    result['sql_ms'] = round(percentile(sql_time, 50), 3)
+    return result
+
+
+def run_scale(scale, repeat):
+    from django.conf import settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    data = seed(scale)
+    host = settings.ALLOWED_HOSTS[0]
+    anonymous = APIClient(HTTP_HOST=host)
+    admin = APIClient(HTTP_HOST=host)
+    admin.force_authenticate(data['admin'])
+
+    results = {}
+    for name, method, kwargs, payload, as_admin in routes(data):
+        def url_for(i, name=name, kwargs=kwargs):
+            if callable(kwargs):
+                kwargs = kwargs(i)
+            return reverse(f'api:{name}', kwargs=kwargs)
+
+        client = admin if as_admin else anonymous
+        results[f'{method.upper()} {name}'] = measure(
+            client, method, url_for, payload, repeat
+        )
+    return results
+
+
+def compare(results, baseline, tolerance, slack, gate=('p50',)):
+    """Строки отчёта и список регрессий относительно базовой линии."""
+    lines, regressions = [], []
+    header = (
+        f'{"маршрут":<28}{"p50":>9}{"p95":>9}{"p99":>9}'
+        f'{"запросы":>9}{"SQL, мс":>9}  база p50/p95/запросы'
+    )
+    for scale, routes_results in results.items():
+        lines.append(f'\nмасштаб {scale}\n{header}')
+        for route, result in routes_results.items():
+            base = baseline.get(scale, {}).get(route)
+            line = (
+                f'{route:<28}{result["p50"]:>9.2f}{result["p95"]:>9.2f}'
+                f'{result["p99"]:>9.2f}{result["queries"]:>9}'
+                f'{result["sql_ms"]:>9.2f}'
+            )
+            if base is None:
+                lines.append(line + '  нет')
+                continue
+            line += (
+                f'  {base["p50"]:.2f}/{base["p95"]:.2f}/{base["queries"]}'
+            )
+            slower = [
+                key for key in gate
+                if result[key] > base[key] * (1 + tolerance) + slack
+            ]
+            if result['queries'] > base['queries']:
+                slower.append('queries')
+            if slower:
+                regressions.append(f'{scale} {route}: {", ".join(slower)}')
+                line += '  ХУЖЕ'
+            lines.append(line)
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--slack-ms', type=float, default=1.0)
+    parser.add_argument(
+        '--gate', nargs='+', default=['p50'],
+        choices=[f'p{percent}' for percent in PERCENTILES],
+    )
+    parser.add_argument('--update', action='store_true')
+    parser.add_argument('--postgres', action='store_true')
+    args = parser.parse_args()
+
+    if not args.postgres:
+        os.environ['DB_ENGINE'] = 'django.db.backends.sqlite3'
+        os.environ['DB_NAME'] = ':memory:'
+
+    import django
+    django.setup()
+
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.db import connection
+
+    results = {}
+    name = connection.creation.create_test_db(verbosity=0)
+    try:
+        for scale in args.scale:
+            call_command('flush', interactive=False, verbosity=0)
+            cache.clear()
+            results[str(scale)] = run_scale(scale, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(name, verbosity=0)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as stream:
+            baseline = json.load(stream)
+    if baseline.get('meta', {}).get('vendor', connection.vendor) != (
+        connection.vendor
+    ):
+        print('Базовая линия снята на другой СУБД, сравнение неточно')
+
+    lines, regressions = compare(
+        results, baseline.get('results', {}), args.tolerance,
+        args.slack_ms, args.gate,
+    )
+    print('\n'.join(lines))
+
+    if args.update:
+        with open(args.baseline, 'w', encoding='utf-8') as stream:
+            json.dump({
+                'meta': {
+                    'vendor': connection.vendor,
+                    'python': platform.python_version(),
+                    'repeat': args.repeat,
+                },
+                'results': results,
+            }, stream, ensure_ascii=False, indent=2, sort_keys=True)
+            stream.write('\n')
+        print(f'\nБазовая линия записана в {args.baseline}')
+    elif regressions:
+        sys.exit('\nРегрессии:\n' + '\n'.join(regressions))
+
+
+if __name__ == '__main__':
+    main()
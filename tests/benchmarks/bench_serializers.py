@@ -0,0 +1,113 @@
+"""Скорость сериализации списков: обычные сериализаторы против .values().
+
+Запуск из корня репозитория:
+
+    python tests/benchmarks/bench_serializers.py [--rows 10000] [--repeat 5]
+
+База SQLite создаётся в памяти, для каждой модели сериализуется
+страница из --rows строк. Перед замером проверяется, что оба пути
+дают одинаковый JSON.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ['DB_ENGINE'] = 'django.db.backends.sqlite3'
+os.environ['DB_NAME'] = ':memory:'
+
+
+def seed(rows):
+    from django.contrib.auth import get_user_model
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    User = get_user_model()
+    Category.objects.bulk_create(
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(rows)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(rows)
+    )
+    # Отзыв уникален для пары (произведение, автор).
+    side = int(rows ** 0.5) + 1
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(side)
+    )
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000) for i in range(side)
+    )
+    users = list(User.objects.order_by('pk')[:side])
+    titles = list(Title.objects.order_by('pk')[:side])
+    Review.objects.bulk_create(
+        Review(
+            title=titles[i // side], author=users[i % side],
+            text=f'Отзыв {i}', score=i % 10 + 1,
+        )
+        for i in range(rows)
+    )
+    review = Review.objects.order_by('pk').first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=users[i % side], text=f'Комментарий {i}')
+        for i in range(rows)
+    )
+
+
+def measure(render, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        content = render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from api import serializers
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+
+    call_command('migrate', verbosity=0)
+    seed(args.rows)
+
+    renderer = JSONRenderer()
+    print(f'{"сериализатор":<20}{"до, строк/с":>16}{"после, строк/с":>18}')
+    for serializer_class in (
+        serializers.CategorySerializer,
+        serializers.GenreSerializer,
+        serializers.ReviewSerializer,
+        serializers.CommentSerializer,
+    ):
+        fast_class = serializers.values_serializer(serializer_class)
+        queryset = serializer_class.Meta.model.objects.all()[:args.rows]
+
+        before, expected = measure(lambda: renderer.render(
+            serializer_class(queryset.all(), many=True).data
+        ), args.repeat)
+        after, content = measure(lambda: renderer.render(
+            fast_class(queryset.values(*fast_class.lookups()), many=True).data
+        ), args.repeat)
+        if content != expected:
+            sys.exit(f'{serializer_class.__name__}: JSON отличается')
+
+        print(
+            f'{serializer_class.__name__:<20}'
+            f'{args.rows / before:>16.0f}{args.rows / after:>18.0f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
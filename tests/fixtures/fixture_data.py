@@ -0,0 +1,91 @@
+import pytest
+
+PAGE_SIZE = 20
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Category
+
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+
+    return [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def titles(category, genres):
+    """Полная страница произведений, у каждого несколько жанров."""
+    from reviews.models import Title
+
+    titles = []
+    for i in range(PAGE_SIZE):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000 + i, category=category
+        )
+        title.genre.set(genres)
+        titles.append(title)
+    return titles
+
+
+@pytest.fixture
+def authors(django_user_model):
+    return [
+        django_user_model.objects.create_user(
+            username=f'author{i}', email=f'author{i}@yamdb.fake'
+        )
+        for i in range(5)
+    ]
+
+
+@pytest.fixture
+def reviews(titles, authors):
+    from reviews.models import Review
+
+    title = titles[0]
+    # Рейтинг произведения (15, 5) накапливают сигналы отзывов.
+    return [
+        Review.objects.create(
+            title=title, author=author, text='Текст отзыва', score=i + 1
+        )
+        for i, author in enumerate(authors)
+    ]
+
+
+@pytest.fixture
+def comments(reviews, authors):
+    from reviews.models import Comment
+
+    review = reviews[0]
+    return [
+        Comment.objects.create(
+            review=review, author=author, text='Текст комментария'
+        )
+        for author in authors
+    ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш не должен переносить ответы между тестами."""
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def throttle_store(settings, monkeypatch, tmp_path_factory):
+    """Корзины лимитов не должны переходить между тестами и запусками."""
+    from api import throttling
+
+    monkeypatch.setattr(throttling, '_stores', {})
+    settings.THROTTLE_FILE_PATH = str(tmp_path_factory.mktemp('throttle'))
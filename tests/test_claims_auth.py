@@ -0,0 +1,96 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+def _token_client(user):
+    from django.contrib.auth.tokens import default_token_generator
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    response = client.post(reverse('api:token'), {
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == 200
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+
+    def test_no_user_query(self, user, reviews):
+        client = _token_client(user)
+        review = reviews[0]
+        url = reverse('api:comments-list', args=[review.title_id, review.pk])
+        client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, {'text': 'Комментарий'})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        assert not [
+            query for query in context.captured_queries
+            if 'FROM "users_user"' in query['sql']
+        ], 'Проверьте, что пользователь не читается из базы на каждый запрос'
+
+    def test_self_edit_uses_full_row(self, user):
+        response = _token_client(user).get(reverse('api:self_edit'))
+        assert response.status_code == 200
+        assert response.json()['email'] == user.email
+
+    def test_self_edit_saves_fresh_row(self, user, django_user_model):
+        client = _token_client(user)
+        url = reverse('api:self_edit')
+        assert client.get(url).status_code == 200
+        # Запись в обход сигналов: строка в кэше устарела.
+        django_user_model.objects.filter(pk=user.pk).update(
+            role='moderator', bio='Новая биография'
+        )
+
+        response = client.patch(url, {'first_name': 'Имя'})
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert user.first_name == 'Имя'
+        assert (user.role, user.bio) == ('moderator', 'Новая биография'), (
+            'Проверьте, что PATCH /users/me/ не возвращает старые поля '
+            'из кэша'
+        )
+
+    def test_claims_user_not_saved(self, user):
+        from users.authentication import (ClaimsUserSaveError,
+                                          access_token_for, user_from_claims)
+
+        claims_user = user_from_claims(access_token_for(user))
+        with pytest.raises(ClaimsUserSaveError):
+            claims_user.save()
+        user.refresh_from_db()
+        assert user.email, 'Проверьте, что строка пользователя не затёрта'
+
+    def test_role_change_revokes_claims(self, admin, admin_client,
+                                        django_user_model):
+        other = django_user_model.objects.create_user(
+            username='other-admin', email='other@yamdb.fake', role='admin'
+        )
+        client = _token_client(other)
+        users_url = reverse('api:user-list')
+        assert client.get(users_url).status_code == 200
+
+        admin_client.patch(
+            reverse('api:user-detail', args=[other.username]),
+            {'role': 'user'},
+        )
+        assert client.get(users_url).status_code == 403, (
+            'Проверьте, что смена роли отзывает права старого токена'
+        )
+
+    def test_deleted_user_rejected(self, user, titles):
+        client = _token_client(user)
+        user.delete()
+        response = client.post(
+            reverse('api:reviews-list', args=[titles[0].pk]),
+            {'text': 'Отзыв', 'score': 5},
+        )
+        assert response.status_code == 401
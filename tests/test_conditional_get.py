@@ -0,0 +1,92 @@
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def _urls(self, review, comment):
+        return [
+            reverse('api:title-list'),
+            reverse('api:title-detail', args=[review.title_id]),
+            reverse('api:genre-list'),
+            reverse('api:category-list'),
+            reverse('api:reviews-list', args=[review.title_id]),
+            reverse('api:comments-list', args=[review.title_id, review.pk]),
+        ]
+
+    def test_not_modified(self, user_client, reviews, comments,
+                          django_assert_num_queries):
+        for url in self._urls(reviews[0], comments[0]):
+            response = user_client.get(url)
+            assert response.status_code == 200
+            assert response.has_header('ETag'), (
+                f'Проверьте, что {url} возвращает заголовок ETag'
+            )
+            assert response.has_header('Last-Modified')
+
+            with django_assert_num_queries(0):
+                not_modified = user_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+            assert not_modified.status_code == 304
+            not_modified = user_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+            assert not_modified.status_code == 304
+
+    def test_write_changes_etag(self, user_client, admin_client, reviews,
+                                comments):
+        review = reviews[0]
+        url = reverse('api:reviews-list', args=[review.title_id])
+        etag = user_client.get(url)['ETag']
+
+        response = admin_client.patch(
+            reverse('api:reviews-detail', args=[review.title_id, review.pk]),
+            {'text': 'Исправленный текст'},
+        )
+        assert response.status_code == 200
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение отзыва меняет ETag списка отзывов'
+        )
+
+        title_url = reverse('api:title-list')
+        etag = user_client.get(title_url)['ETag']
+        admin_client.delete(
+            reverse('api:reviews-detail', args=[review.title_id, review.pk])
+        )
+        response = user_client.get(title_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что рейтинг в списке произведений не кэшируется '
+            'клиентом после удаления отзыва'
+        )
+
+    def test_author_rename_changes_etag(self, user_client, reviews,
+                                        comments):
+        review = reviews[0]
+        urls = [
+            reverse('api:reviews-list', args=[review.title_id]),
+            reverse('api:comments-list', args=[review.title_id, review.pk]),
+        ]
+        etags = [user_client.get(url)['ETag'] for url in urls]
+
+        author = review.author
+        author.username = 'renamed_author'
+        author.save()
+        for url, etag in zip(urls, etags):
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200, (
+                f'Проверьте, что смена имени автора меняет ETag {url}'
+            )
+
+    def test_local_cache_no_validators(self, user_client, reviews,
+                                       settings):
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        response = user_client.get(reverse('api:title-list'))
+        assert response.status_code == 200
+        assert not response.has_header('ETag'), (
+            'Проверьте, что с кэшем одного процесса ETag не выдаётся'
+        )
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def _signup(self, client, username):
+        response = client.post(reverse('api:signup'), {
+            'username': username, 'email': f'{username}@yamdb.fake',
+        })
+        assert response.status_code == 200
+
+    def test_signup_enqueues(self, api_client):
+        from users.models import OutboxEmail
+
+        self._signup(api_client, 'newuser')
+        assert not mail.outbox, (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        email = OutboxEmail.objects.get()
+        assert email.to == 'newuser@yamdb.fake'
+        assert email.sent_at is None
+
+    def test_worker_uses_file_backend(self, api_client, settings, tmp_path):
+        from users.models import OutboxEmail
+
+        settings.EMAIL_BACKEND = (
+            'django.core.mail.backends.filebased.EmailBackend'
+        )
+        settings.EMAIL_FILE_PATH = str(tmp_path)
+        for i in range(3):
+            self._signup(api_client, f'newuser{i}')
+
+        call_command('send_emails', '--once', '--batch-size', '2')
+
+        assert not OutboxEmail.objects.filter(sent_at__isnull=True).exists()
+        # Одно соединение на весь запуск — один файл с письмами.
+        files = os.listdir(tmp_path)
+        assert len(files) == 1
+        with open(tmp_path / files[0]) as messages:
+            assert messages.read().count('Ваш код для получения токена') == 3
+
+    def test_retry_with_backoff(self, api_client, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.utils import timezone
+        from users.models import OutboxEmail
+
+        self._signup(api_client, 'newuser')
+
+        def fail(self, messages):
+            raise OSError('Почтовый сервер недоступен')
+
+        monkeypatch.setattr(EmailBackend, 'send_messages', fail)
+        call_command('send_emails', '--once')
+        email = OutboxEmail.objects.get()
+        assert email.attempts == 1
+        assert email.sent_at is None
+        assert email.next_attempt_at > timezone.now(), (
+            'Проверьте, что повторная отправка откладывается'
+        )
+
+        monkeypatch.undo()
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_emails', '--once')
+        assert OutboxEmail.objects.get().sent_at is not None
+        assert len(mail.outbox) == 1
+
+    def test_results_recorded_on_errors(self, api_client, monkeypatch):
+        from django.core.mail import get_connection
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.utils import timezone
+        from users.models import OutboxEmail
+        from users.outbox import deliver_batch
+
+        for i in range(4):
+            self._signup(api_client, f'newuser{i}')
+        send = EmailBackend.send_messages
+        errors = iter([
+            None, ValueError('Битый заголовок'), None, KeyboardInterrupt,
+        ])
+
+        def flaky(self, messages):
+            error = next(errors)
+            if error is not None:
+                raise error
+            return send(self, messages)
+
+        def server_down(self):
+            raise OSError('Почтовый сервер недоступен')
+
+        monkeypatch.setattr(EmailBackend, 'send_messages', flaky)
+        monkeypatch.setattr(EmailBackend, 'open', server_down)
+        connection = get_connection()
+        assert deliver_batch(connection, 10) == (1, 1), (
+            'Проверьте, что без соединения остаток пачки не отправляется'
+        )
+        emails = list(OutboxEmail.objects.order_by('pk'))
+        assert emails[0].sent_at is not None
+        assert (emails[1].attempts, emails[1].last_error) == (
+            1, 'Битый заголовок'
+        ), 'Проверьте, что любая ошибка письма считается попыткой'
+        assert [email.attempts for email in emails[2:]] == [0, 0]
+
+        # Аренда остатка пачки истекла.
+        OutboxEmail.objects.filter(
+            pk__in=[email.pk for email in emails[2:]]
+        ).update(next_attempt_at=timezone.now())
+        with pytest.raises(KeyboardInterrupt):
+            deliver_batch(connection, 10)
+        assert OutboxEmail.objects.get(pk=emails[2].pk).sent_at, (
+            'Проверьте, что отправленные письма отмечаются при прерывании'
+        )
+        assert len(mail.outbox) == 2
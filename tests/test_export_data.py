@@ -0,0 +1,41 @@
+import gzip
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestExportData:
+
+    def test_round_trip(self, tmp_path):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        output = io.StringIO()
+        call_command('load_data', '--noinput', stdout=output)
+        call_command('export_data', '--folder', str(tmp_path), stdout=output)
+
+        with CaptureQueriesContext(connection) as context:
+            call_command(
+                'load_data', '--mode=upsert', '--folder', str(tmp_path),
+                stdout=output,
+            )
+        assert not [
+            query for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ], 'Проверьте, что выгрузка повторяет формат файлов load_data'
+
+    def test_jsonl_gzip(self, tmp_path, reviews):
+        call_command(
+            'export_data', 'review.csv', '--folder', str(tmp_path),
+            '--format=jsonl', '--gzip', '--chunk-size=2',
+            stdout=io.StringIO(),
+        )
+        with gzip.open(tmp_path / 'review.jsonl.gz', 'rt') as stream:
+            rows = [json.loads(line) for line in stream]
+        assert [row['id'] for row in rows] == sorted(
+            review.pk for review in reviews
+        )
+        assert rows[0]['author'] == reviews[0].author_id
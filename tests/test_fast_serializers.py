@@ -0,0 +1,44 @@
+import pytest
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+
+@pytest.mark.django_db
+class TestValuesReadSerializer:
+
+    def _render(self, serializer_class, data, many):
+        return JSONRenderer().render(serializer_class(data, many=many).data)
+
+    @pytest.mark.parametrize('serializer_name', [
+        'CategorySerializer', 'GenreSerializer',
+        'ReviewSerializer', 'CommentSerializer',
+    ])
+    def test_same_json(self, serializer_name, category, genres, comments):
+        from api import serializers
+
+        serializer_class = getattr(serializers, serializer_name)
+        fast_class = serializers.values_serializer(serializer_class)
+        queryset = serializer_class.Meta.model.objects.order_by('pk')
+
+        expected = self._render(serializer_class, queryset, many=True)
+        rows = queryset.values(*fast_class.lookups())
+        assert self._render(fast_class, rows, many=True) == expected, (
+            f'Проверьте, что быстрый {serializer_name} выдаёт тот же JSON'
+        )
+
+    def test_views_output(self, user_client, reviews, comments):
+        from api.serializers import CommentSerializer, ReviewSerializer
+
+        review = reviews[0]
+        response = user_client.get(
+            reverse('api:reviews-detail', args=[review.title_id, review.pk])
+        )
+        assert response.json() == ReviewSerializer(review).data
+
+        response = user_client.get(reverse(
+            'api:comments-list', args=[review.title_id, review.pk]
+        ))
+        assert response.json()['results'] == [
+            CommentSerializer(comment).data
+            for comment in review.comments.all()
+        ]
@@ -0,0 +1,60 @@
+import io
+import os
+
+import pytest
+from django.core.management import call_command
+
+OPTIONS = ('--users=50', '--titles=30', '--max-reviews-per-title=20')
+
+
+def generate(folder, *options):
+    call_command(
+        'generate_data', '--csv', str(folder), *OPTIONS, *options,
+        stdout=io.StringIO(),
+    )
+
+
+def test_deterministic(tmp_path):
+    generate(tmp_path / 'first')
+    generate(tmp_path / 'second')
+    generate(tmp_path / 'other', '--seed=2')
+    files = sorted(os.listdir(tmp_path / 'first'))
+    first = [(tmp_path / 'first' / file).read_text() for file in files]
+    assert first == [
+        (tmp_path / 'second' / file).read_text() for file in files
+    ], 'Проверьте, что при одном seed набор данных не меняется'
+    assert first != [
+        (tmp_path / 'other' / file).read_text() for file in files
+    ], 'Проверьте, что seed влияет на набор данных'
+
+
+@pytest.mark.django_db
+class TestGenerateData:
+
+    def test_csv_loads(self, tmp_path):
+        from reviews.models import Comment, Review, Title
+
+        generate(tmp_path)
+        call_command(
+            'load_data', '--noinput', '--folder', str(tmp_path),
+            stdout=io.StringIO(),
+        )
+        assert Title.objects.count() == 30
+        assert Review.objects.exists() and Comment.objects.exists()
+        pairs = list(Review.objects.values_list('title_id', 'author_id'))
+        assert len(pairs) == len(set(pairs)), (
+            'Проверьте, что автор оставляет один отзыв на произведение'
+        )
+
+    def test_database(self):
+        from reviews.models import Review, Title
+
+        call_command(
+            'generate_data', '--noinput', *OPTIONS,
+            '--reviews-per-title=3', '--batch-size=7',
+            stdout=io.StringIO(),
+        )
+        assert Review.objects.count() == 90
+        assert not Title.objects.filter(rating_count=0).exists(), (
+            'Проверьте, что рейтинги пересчитываются после генерации'
+        )
@@ -0,0 +1,188 @@
+import csv
+import io
+import os
+import shutil
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+def _rows(folder, file):
+    with open(os.path.join(folder, file), encoding='utf-8', newline='') as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+def test_dependency_stages():
+    from reviews.dataset import dependency_stages, get_dataset
+
+    stages = [
+        {model.__name__ for _, model in stage}
+        for stage in dependency_stages(get_dataset())
+    ]
+    assert stages == [
+        {'Genre', 'Category', 'User'},
+        {'Title'},
+        {'Title_genre', 'Review'},
+        {'Comment'},
+    ], 'Проверьте, что модели загружаются после тех, на кого ссылаются'
+
+
+@pytest.mark.django_db
+class TestLoadData:
+
+    def test_load(self, user, django_assert_max_num_queries):
+        from reviews.dataset import DATA_FOLDER, get_dataset
+
+        # Запросы не зависят от числа строк: файлы вставляются пачками.
+        with django_assert_max_num_queries(40):
+            call_command(
+                'load_data', '--noinput', stdout=io.StringIO()
+            )
+        for file, model in get_dataset():
+            assert model.objects.count() == _rows(DATA_FOLDER, file), (
+                f'Проверьте, что {file} загружен полностью'
+            )
+
+        from reviews.models import Title, TitleDocument
+        title = Title.objects.get(pk=1)
+        assert title.genre.exists() and title.rating_count, (
+            'Проверьте, что загружены жанры и пересчитан рейтинг'
+        )
+        assert TitleDocument.objects.count() == Title.objects.count()
+
+    # Неизвестный id в первой пачке файла и в одной из следующих.
+    @pytest.mark.parametrize('chunk_size', ['5000', '7'])
+    def test_unknown_foreign_key(self, tmp_path, titles, chunk_size):
+        from reviews.dataset import DATA_FOLDER
+        from reviews.models import Title
+
+        folder = shutil.copytree(DATA_FOLDER, str(tmp_path / 'data'))
+        with open(os.path.join(folder, 'comments.csv'), 'a',
+                  encoding='utf-8') as f:
+            f.write('\n999,999999,Текст,100,2019-09-24T21:08:21.567Z\n')
+
+        with pytest.raises(CommandError, match='999999'):
+            call_command(
+                'load_data', '--noinput', '--folder', folder,
+                '--chunk-size', chunk_size, stdout=io.StringIO(),
+            )
+        assert set(Title.objects.values_list('pk', flat=True)) == {
+            title.pk for title in titles
+        }, (
+            'Проверьте, что ошибка в файле откатывает всю загрузку'
+        )
+
+    def test_replace_deletes_users_in_bulk(self, admin, django_user_model):
+        from django.contrib.admin.models import ADDITION, LogEntry
+        from django.contrib.auth.models import Group
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from users.authentication import IDENTITY_KEY, get_identity
+
+        django_user_model.objects.bulk_create(
+            django_user_model(username=f'bulk{i}', email=f'bulk{i}@yamdb.fake')
+            for i in range(50)
+        )
+        admin.groups.add(Group.objects.create(name='editors'))
+        LogEntry.objects.log_action(
+            admin.pk, None, None, 'Запись', ADDITION
+        )
+        get_identity(admin.pk)
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('load_data', '--noinput', stdout=io.StringIO())
+        updates = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "users_user"')
+        ]
+        assert len(updates) == 1, (
+            'Проверьте, что пользователи удаляются без UPDATE на каждого'
+        )
+        assert not LogEntry.objects.exists()
+        assert cache.get(IDENTITY_KEY.format(admin.pk)) is None, (
+            'Проверьте, что строки удалённых пользователей убраны из кэша'
+        )
+
+    def test_upsert(self, tmp_path):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from reviews.dataset import DATA_FOLDER
+        from reviews.models import Title
+
+        output = io.StringIO()
+        call_command('load_data', '--noinput', stdout=output)
+        with CaptureQueriesContext(connection) as context:
+            call_command('load_data', '--mode=upsert', stdout=output)
+        assert not [
+            query for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ], 'Проверьте, что повторная загрузка тех же данных ничего не пишет'
+
+        folder = shutil.copytree(DATA_FOLDER, str(tmp_path / 'data'))
+        path = os.path.join(folder, 'titles.csv')
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content.replace('1,Побег из Шоушенка,', '1,Побег,'))
+        call_command(
+            'load_data', '--mode=upsert', '--folder', folder, stdout=output
+        )
+        title = Title.objects.get(pk=1)
+        assert title.name == 'Побег'
+        assert '"Побег"' in title.document.body, (
+            'Проверьте, что документ изменённого произведения пересобран'
+        )
+
+    def test_revokes_claims(self, tmp_path):
+        from django.core.cache import cache
+        from reviews.dataset import DATA_FOLDER
+        from users.authentication import (ClaimsJWTAuthentication,
+                                          access_token_for, is_claims_user)
+        from users.models import User
+
+        output = io.StringIO()
+        auth = ClaimsJWTAuthentication()
+
+        def tokens():
+            # Токены выданы до загрузки, которую проверяем.
+            User.objects.update(claims_revoked_at=None)
+            cache.clear()
+            return {
+                user.pk: access_token_for(user)
+                for user in User.objects.filter(pk__in=[100, 101])
+            }
+
+        def trusted(token):
+            cache.clear()
+            return is_claims_user(auth.get_user(token))
+
+        call_command('load_data', '--noinput', stdout=output)
+        issued = tokens()
+        assert trusted(issued[100]) and trusted(issued[101])
+
+        folder = shutil.copytree(DATA_FOLDER, str(tmp_path / 'data'))
+        path = os.path.join(folder, 'users.csv')
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content.replace(
+                'capt_obvious@yamdb.fake,admin', 'capt_obvious@yamdb.fake,user'
+            ))
+        call_command(
+            'load_data', '--mode=upsert', '--folder', folder, stdout=output
+        )
+        assert not trusted(issued[101]), (
+            'Проверьте, что изменение пользователя при загрузке отзывает '
+            'утверждения его токенов'
+        )
+        assert auth.get_user(issued[101]).role == 'user'
+        assert trusted(issued[100])
+
+        issued = tokens()
+        call_command('load_data', '--noinput', stdout=output)
+        assert not trusted(issued[100]), (
+            'Проверьте, что пользователи, загруженные заново, не доверяют '
+            'старым токенам'
+        )
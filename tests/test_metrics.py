@@ -0,0 +1,88 @@
+import json
+import re
+
+import pytest
+from django.urls import reverse
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def parse(text):
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        labels = tuple(sorted(re.findall(r'(\w+)="([^"]*)"', labels or '')))
+        samples[name, labels] = float(value)
+    return samples
+
+
+@pytest.fixture
+def metrics_settings(settings, tmp_path):
+    settings.METRICS = True
+    settings.METRICS_PATH = str(tmp_path)
+    return settings
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def scrape(self, client):
+        response = client.get(reverse('metrics'))
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        return parse(response.content.decode())
+
+    def test_disabled(self, client, settings):
+        settings.METRICS = False
+        assert client.get(reverse('metrics')).status_code == 404
+
+    def test_counts_views(self, client, metrics_settings, titles):
+        before = self.scrape(client)
+        for i in range(3):
+            # Разные адреса: ответ из кэша обходится без запросов к базе.
+            client.get(reverse('api:title-list'), {'n': i})
+        client.get(reverse('api:title-detail', args=[titles[0].pk]))
+        after = self.scrape(client)
+
+        def delta(name, **labels):
+            key = (name, tuple(sorted(labels.items())))
+            return after.get(key, 0) - before.get(key, 0)
+
+        assert delta(
+            'yamdb_http_requests_total',
+            view='title-list', method='GET', status='200',
+        ) == 3, 'Проверьте, что запросы считаются по маршрутам'
+        assert delta(
+            'yamdb_http_request_duration_seconds_count', view='title-detail'
+        ) == 1
+        assert delta(
+            'yamdb_http_request_duration_seconds_bucket',
+            view='title-list', le='+Inf',
+        ) == 3
+        assert delta('yamdb_db_queries_total', view='title-list') >= 3, (
+            'Проверьте, что считаются запросы к базе'
+        )
+        assert after['yamdb_http_requests_in_flight', ()] == 1
+
+    def test_aggregates_processes(self, client, metrics_settings, tmp_path):
+        # Снимок завершившегося процесса: счётчики остаются в сумме,
+        # незавершённые запросы — нет.
+        (tmp_path / '999999999.json').write_text(json.dumps({
+            'pid': 999999999,
+            'in_flight': 5,
+            'requests': [['genre-list', 'GET', 200, 7]],
+            'durations': [['genre-list', [7] + [0] * 10, 7, 0.01]],
+            'queries': [['genre-list', 14, 0.002]],
+        }))
+        samples = self.scrape(client)
+        assert samples[
+            'yamdb_http_requests_total',
+            (('method', 'GET'), ('status', '200'), ('view', 'genre-list')),
+        ] == 7, 'Проверьте, что метрики складываются по всем процессам'
+        assert samples[
+            'yamdb_http_request_duration_seconds_bucket',
+            (('le', '0.005'), ('view', 'genre-list')),
+        ] == 7
+        assert samples['yamdb_http_requests_in_flight', ()] == 1
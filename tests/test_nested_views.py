@@ -0,0 +1,33 @@
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestNestedViews:
+
+    def test_author_edits_without_extra_queries(
+        self, django_assert_max_num_queries, reviews, comments
+    ):
+        from rest_framework.test import APIClient
+
+        comment = comments[0]
+        review = comment.review
+        client = APIClient()
+        client.force_authenticate(user=comment.author)
+        url = reverse(
+            'api:comments-detail',
+            args=[review.title_id, review.pk, comment.pk],
+        )
+        # Отзыв, комментарий с автором и UPDATE.
+        with django_assert_max_num_queries(3):
+            response = client.patch(url, {'text': 'Новый текст'})
+        assert response.status_code == 200
+        assert response.json()['author'] == comment.author.username
+
+    def test_other_user_forbidden(self, user_client, reviews):
+        review = reviews[0]
+        url = reverse('api:reviews-detail', args=[review.title_id, review.pk])
+        response = user_client.patch(url, {'text': 'Чужой текст'})
+        assert response.status_code == 403, (
+            'Проверьте, что чужой отзыв нельзя изменить'
+        )
@@ -0,0 +1,161 @@
+import json
+from base64 import b64encode
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .fixtures.fixture_data import PAGE_SIZE
+
+ROWS = PAGE_SIZE * 2 + 5
+
+
+@pytest.fixture
+def tied_titles(category):
+    """Произведения с повторяющимися названиями: порядок решает id."""
+    from reviews.models import Title
+
+    return [
+        Title.objects.create(
+            name=f'Произведение {i % 3}', year=2000, category=category
+        )
+        for i in range(ROWS)
+    ]
+
+
+@pytest.fixture
+def many_reviews(tied_titles, django_user_model):
+    from reviews.models import Review
+
+    return [
+        Review.objects.create(
+            title=tied_titles[0], text='Отзыв', score=5,
+            author=django_user_model.objects.create_user(
+                username=f'reader{i}', email=f'reader{i}@yamdb.fake'
+            ),
+        )
+        for i in range(ROWS)
+    ]
+
+
+@pytest.fixture
+def many_comments(many_reviews):
+    from reviews.models import Comment
+
+    return [
+        Comment.objects.create(
+            review=many_reviews[0], author=review.author, text='Комментарий'
+        )
+        for review in many_reviews
+    ]
+
+
+def _walk(client, url, direction):
+    """Страницы по ссылкам direction, начиная с url."""
+    pages = []
+    while url:
+        data = client.get(url).json()
+        assert 'count' not in data, (
+            'Проверьте, что в режиме курсора count не возвращается'
+        )
+        pages.append([row['id'] for row in data['results']])
+        url = data[direction]
+    return pages
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def _check(self, client, url, expected):
+        pages = _walk(client, f'{url}?cursor=', 'next')
+        assert [len(page) for page in pages] == [PAGE_SIZE, PAGE_SIZE, 5]
+        assert sum(pages, []) == expected, (
+            'Проверьте, что курсор обходит все строки ровно один раз '
+            'в порядке списка'
+        )
+        last = client.get(f'{url}?cursor=').json()
+        while last['next']:
+            last = client.get(last['next']).json()
+        back = _walk(client, last['previous'], 'previous')
+        assert back == pages[-2::-1], (
+            'Проверьте, что ссылки previous возвращают те же страницы'
+        )
+
+    def test_titles(self, user_client, tied_titles):
+        expected = [
+            title.pk for title in sorted(
+                tied_titles, key=lambda title: (title.name, title.pk),
+                reverse=True,
+            )
+        ]
+        self._check(user_client, reverse('api:title-list'), expected)
+
+    def test_reviews(self, user_client, many_reviews):
+        url = reverse(
+            'api:reviews-list', kwargs={'title_id': many_reviews[0].title_id}
+        )
+        expected = sorted((review.pk for review in many_reviews), reverse=True)
+        self._check(user_client, url, expected)
+
+    def test_comments(self, user_client, many_comments):
+        review = many_comments[0].review
+        url = reverse('api:comments-list', kwargs={
+            'title_id': review.title_id, 'review_id': review.pk,
+        })
+        expected = sorted(
+            (comment.pk for comment in many_comments), reverse=True
+        )
+        self._check(user_client, url, expected)
+
+    @pytest.mark.parametrize('cursor', [
+        {'v': ['a', 'x'], 'r': 0},
+        {'v': [None, None], 'r': 0},
+        {'v': [['a'], {}], 'r': 1},
+        {'v': 'ab', 'r': 0},
+        [None, None],
+    ])
+    def test_invalid_cursor(self, user_client, tied_titles, comments,
+                            cursor):
+        review = comments[0].review
+        encoded = b64encode(json.dumps(cursor).encode()).decode()
+        urls = [
+            reverse('api:title-list'),
+            reverse('api:reviews-list', args=[review.title_id]),
+            reverse('api:comments-list', args=[review.title_id, review.pk]),
+        ]
+        for url in urls:
+            assert user_client.get(f'{url}?cursor=garbage').status_code == 404
+            response = user_client.get(url, {'cursor': encoded})
+            assert response.status_code == 404, (
+                f'Проверьте, что {url} отвечает 404 на курсор {cursor}'
+            )
+
+
+@pytest.mark.django_db
+class TestCachedCount:
+
+    def _count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            data = client.get(url).json()
+        counts = [
+            query for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        return data['count'], len(counts)
+
+    def test_large_count_reused(self, user_client, tied_titles, settings):
+        settings.PAGINATION_COUNT_CACHE_THRESHOLD = ROWS
+        url = reverse('api:title-list')
+        assert self._count_queries(user_client, url) == (ROWS, 1)
+        assert self._count_queries(user_client, f'{url}?page=2') == (
+            ROWS, 0
+        ), 'Проверьте, что количество большой выборки берётся из кэша'
+
+    def test_small_count_not_cached(self, user_client, tied_titles, settings):
+        settings.PAGINATION_COUNT_CACHE_THRESHOLD = ROWS + 1
+        url = reverse('api:title-list')
+        assert self._count_queries(user_client, url) == (ROWS, 1)
+        assert self._count_queries(user_client, url) == (ROWS, 1), (
+            'Проверьте, что маленькие выборки считаются заново'
+        )
@@ -0,0 +1,170 @@
+import pytest
+from django.urls import reverse
+
+from .fixtures.fixture_data import PAGE_SIZE
+
+# Максимальное число SQL-запросов на каждый маршрут api/urls.py.
+# Списки проверяются на полной странице пагинации (PAGE_SIZE
+# произведений, отзывов и комментариев), поэтому запрос на каждую
+# строку (N+1) сразу выходит за бюджет.
+# GET-запросы к коллекциям включают один запрос метки для ETag.
+# Удаление жанра или категории пересобирает документы произведений
+# пачками, поэтому тоже не зависит от их количества.
+# Бюджет titles/bulk/ дан для пачки из одного произведения: на SQLite
+# произведения вставляются по одному, остальные запросы общие на пачку.
+QUERY_BUDGETS = {
+    'signup': 6,
+    'token': 1,
+    'self_edit': 0,
+    'user-list': 2,
+    'user-detail': 1,
+    'category-list': 3,
+    'category-detail': 9,
+    'genre-list': 3,
+    'genre-detail': 9,
+    'title-list': 3,
+    'title-detail': 2,
+    'title-bulk': 11,
+    'title-export': 2,
+    'reviews-list': 4,
+    'reviews-detail': 3,
+    'comments-list': 4,
+    'comments-detail': 3,
+}
+
+
+def _route_names():
+    from api.urls import urlpatterns
+    from django.urls import URLPattern, URLResolver
+
+    names = set()
+    patterns = list(urlpatterns)
+    while patterns:
+        pattern = patterns.pop()
+        if isinstance(pattern, URLResolver):
+            patterns.extend(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            names.add(pattern.name)
+    return names
+
+
+@pytest.fixture
+def page_reviews(titles, django_user_model):
+    """Полная страница отзывов к первому произведению."""
+    from reviews.models import Review
+
+    return [
+        Review.objects.create(
+            title=titles[0], text='Текст отзыва', score=i % 10 + 1,
+            author=django_user_model.objects.create_user(
+                username=f'reviewer{i}', email=f'reviewer{i}@yamdb.fake'
+            ),
+        )
+        for i in range(PAGE_SIZE)
+    ]
+
+
+@pytest.fixture
+def page_comments(page_reviews):
+    """Полная страница комментариев к первому отзыву, разных авторов."""
+    from reviews.models import Comment
+
+    return [
+        Comment.objects.create(
+            review=page_reviews[0], author=review.author,
+            text='Текст комментария',
+        )
+        for review in page_reviews
+    ]
+
+
+def test_every_route_has_budget():
+    missing = _route_names() - set(QUERY_BUDGETS)
+    assert not missing, (
+        f'Добавьте бюджет запросов для маршрутов: {sorted(missing)}'
+    )
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    def _check(self, django_assert_max_num_queries, client, method, name,
+               kwargs=None, data=None, status=200):
+        url = reverse(f'api:{name}', kwargs=kwargs)
+        with django_assert_max_num_queries(QUERY_BUDGETS[name]):
+            response = getattr(client, method)(url, data=data, format='json')
+        assert response.status_code == status, (
+            f'Проверьте, что {method.upper()} {url} '
+            f'возвращает статус {status}'
+        )
+
+    def test_auth(self, django_assert_max_num_queries, api_client, user):
+        self._check(
+            django_assert_max_num_queries, api_client, 'post', 'signup',
+            data={'username': 'newuser', 'email': 'newuser@yamdb.fake'},
+        )
+        self._check(
+            django_assert_max_num_queries, api_client, 'post', 'token',
+            data={'username': user.username, 'confirmation_code': 'wrong'},
+            status=400,
+        )
+
+    def test_users(self, django_assert_max_num_queries, admin_client,
+                   user_client, authors):
+        self._check(django_assert_max_num_queries, user_client, 'get',
+                    'self_edit')
+        self._check(django_assert_max_num_queries, admin_client, 'get',
+                    'user-list')
+        self._check(django_assert_max_num_queries, admin_client, 'get',
+                    'user-detail', {'username': authors[0].username})
+
+    def test_categories_and_genres(self, django_assert_max_num_queries,
+                                   admin_client, api_client, titles,
+                                   category, genres):
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'category-list')
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'genre-list')
+        self._check(django_assert_max_num_queries, admin_client, 'delete',
+                    'category-detail', {'slug': category.slug}, status=204)
+        self._check(django_assert_max_num_queries, admin_client, 'delete',
+                    'genre-detail', {'slug': genres[0].slug}, status=204)
+
+    def test_titles(self, django_assert_max_num_queries, api_client,
+                    titles, reviews):
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'title-list')
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'title-detail', {'pk': titles[0].pk})
+
+    def test_titles_bulk(self, django_assert_max_num_queries, admin_client,
+                         genres, category):
+        item = {
+            'name': 'Произведение', 'year': 2000, 'category': category.slug,
+            'genre': [genre.slug for genre in genres],
+        }
+        self._check(django_assert_max_num_queries, admin_client, 'post',
+                    'title-bulk', data=[item], status=201)
+
+    def test_titles_export(self, django_assert_max_num_queries,
+                           admin_client, titles, reviews):
+        url = reverse('api:title-export')
+        # Строки читаются при отдаче потока, поэтому он читается целиком.
+        with django_assert_max_num_queries(QUERY_BUDGETS['title-export']):
+            response = admin_client.get(url)
+            lines = b''.join(response.streaming_content).splitlines()
+        assert len(lines) == len(titles)
+
+    def test_reviews_and_comments(self, django_assert_max_num_queries,
+                                  api_client, page_reviews, page_comments):
+        review, comments = page_reviews[0], page_comments
+        title_kwargs = {'title_id': review.title_id}
+        review_kwargs = {'title_id': review.title_id, 'review_id': review.pk}
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'reviews-list', title_kwargs)
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'reviews-detail', {**title_kwargs, 'pk': review.pk})
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'comments-list', review_kwargs)
+        self._check(django_assert_max_num_queries, api_client, 'get',
+                    'comments-detail', {**review_kwargs, 'pk': comments[0].pk})
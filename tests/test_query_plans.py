@@ -0,0 +1,80 @@
+import re
+
+import pytest
+
+TITLES = 2000
+REVIEWS_PER_TITLE = 5
+
+# Полный проход по таблице или сортировка в плане запроса:
+# SQLite пишет «SCAN <таблица>» без индекса и «USE TEMP B-TREE FOR ORDER
+# BY», PostgreSQL — узлы «Seq Scan» и «Sort».
+BAD_PLAN = {
+    'sqlite': re.compile(r'SCAN (TABLE )?\w+$|USE TEMP B-TREE', re.M),
+    'postgresql': re.compile(r'Seq Scan|\bSort\b'),
+}
+
+
+@pytest.fixture
+def catalog(django_user_model):
+    from django.db import connection
+    from reviews.models import Comment, Genre, Review, Title
+
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(200)
+    )
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(REVIEWS_PER_TITLE)
+    )
+    users = list(django_user_model.objects.order_by('pk'))
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i:05}', year=1900 + i % 120)
+        for i in range(TITLES)
+    )
+    titles = list(Title.objects.order_by('pk'))
+    Review.objects.bulk_create(
+        Review(title=title, author=user, text='Отзыв', score=5)
+        for title in titles for user in users
+    )
+    reviews = list(Review.objects.order_by('pk')[:TITLES])
+    Comment.objects.bulk_create(
+        Comment(review=review, author=users[0], text='Комментарий')
+        for review in reviews for _ in range(3)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return titles[TITLES // 2], reviews[TITLES // 2]
+
+
+def hot_queries(title, review):
+    from reviews.models import Genre, Title
+
+    titles = Title.objects.select_related('document').only(
+        'name', 'rating_sum', 'rating_count', 'document__body'
+    )
+    return {
+        'reviews': title.reviews.all()[:20],
+        'reviews_cursor': title.reviews.filter(id__lt=review.pk)[:20],
+        'comments': review.comments.all()[:20],
+        'titles': titles.order_by('-name')[:20],
+        'titles_cursor': titles.order_by('-name', '-id')[:20],
+        'titles_year': titles.filter(year=2000).order_by('-name')[:20],
+        'genres': Genre.objects.all()[:20],
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', [
+    'reviews', 'reviews_cursor', 'comments', 'titles', 'titles_cursor',
+    'titles_year', 'genres',
+])
+def test_query_plan(catalog, name):
+    from django.db import connection
+
+    if connection.vendor not in BAD_PLAN:
+        pytest.skip(f'Нет правил разбора плана для {connection.vendor}')
+    plan = hot_queries(*catalog)[name].explain()
+    assert not BAD_PLAN[connection.vendor].search(plan), (
+        f'Проверьте индексы для запроса {name}: в плане полный проход '
+        f'по таблице или сортировка:\n{plan}'
+    )
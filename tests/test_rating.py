@@ -0,0 +1,73 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+
+def _rating(title):
+    title.refresh_from_db()
+    return title.rating_sum, title.rating_count
+
+
+@pytest.mark.django_db
+class TestRating:
+
+    def test_update_and_destroy(self, admin_client, reviews):
+        review = reviews[0]
+        title = review.title
+        url = reverse(
+            'api:reviews-detail',
+            kwargs={'title_id': title.pk, 'pk': review.pk},
+        )
+        assert _rating(title) == (15, 5), (
+            'Проверьте, что создание отзывов накапливает рейтинг'
+        )
+
+        response = admin_client.patch(url, {'score': 10}, format='json')
+        assert response.status_code == 200
+        assert _rating(title) == (24, 5), (
+            'Проверьте, что изменение оценки меняет рейтинг'
+        )
+
+        assert admin_client.delete(url).status_code == 204
+        assert _rating(title) == (14, 4), (
+            'Проверьте, что удаление отзыва меняет рейтинг'
+        )
+
+    def test_cascade_delete(self, admin_client, reviews):
+        title = reviews[0].title
+        author = reviews[0].author
+        response = admin_client.delete(
+            reverse('api:user-detail', kwargs={'username': author.username})
+        )
+        assert response.status_code == 204
+        assert _rating(title) == (14, 4), (
+            'Проверьте, что отзывы, удалённые вместе с автором, '
+            'не остаются в рейтинге'
+        )
+
+    def test_orm_writes(self, titles, reviews):
+        from reviews.models import Review
+
+        title, other = titles[0], titles[1]
+        review = Review.objects.get(pk=reviews[1].pk)
+        review.title = other
+        review.save()
+        assert _rating(title) == (13, 4)
+        assert _rating(other) == (2, 1), (
+            'Проверьте, что перенос отзыва переносит оценку'
+        )
+        Review.objects.filter(title=title).delete()
+        assert _rating(title) == (0, 0)
+
+    def test_recalculate_command(self, titles, reviews):
+        from reviews.models import Title
+
+        title = titles[0]
+        Title.objects.filter(pk=title.pk).update(
+            rating_sum=100, rating_count=1
+        )
+        call_command('recalculate_rating', stdout=io.StringIO())
+        assert _rating(title) == (15, 5)
+        assert _rating(titles[1]) == (0, 0)
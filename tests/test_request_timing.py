@@ -0,0 +1,67 @@
+import json
+import logging
+
+import pytest
+from django.urls import reverse
+
+
+def _timings(response):
+    timings = {}
+    for item in response['Server-Timing'].split(', '):
+        name, *params = item.split(';')
+        timings[name] = dict(param.split('=', 1) for param in params)
+    return timings
+
+
+@pytest.mark.django_db
+class TestRequestTiming:
+
+    def _url(self, reviews):
+        return reverse(
+            'api:reviews-list', kwargs={'title_id': reviews[0].title_id}
+        )
+
+    def test_disabled(self, admin_client, reviews, settings):
+        settings.REQUEST_TIMING = False
+        response = admin_client.get(self._url(reviews))
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что замеры выключены без REQUEST_TIMING'
+        )
+
+    def test_server_timing(self, admin_client, reviews, settings):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        settings.REQUEST_TIMING = True
+        settings.REQUEST_TIMING_SLOW_MS = 10 ** 6
+        url = self._url(reviews)
+        admin_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(url)
+        timings = _timings(response)
+        assert set(timings) == {'db', 'serialize', 'render', 'total'}
+        assert timings['db']['desc'] == (
+            f'"{len(context.captured_queries)} queries"'
+        ), 'Проверьте, что в заголовке указано число запросов к базе'
+        assert float(timings['serialize']['dur']) > 0
+        assert float(timings['render']['dur']) > 0
+        assert float(timings['total']['dur']) >= max(
+            float(timings[name]['dur']) for name in ('db', 'render')
+        )
+
+    def test_slow_request_log(self, admin_client, reviews, settings, caplog):
+        settings.REQUEST_TIMING = True
+        settings.REQUEST_TIMING_SLOW_MS = 0
+        settings.REQUEST_TIMING_TOP_SQL = 2
+        with caplog.at_level(logging.WARNING, logger='api.timing'):
+            admin_client.get(self._url(reviews))
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['view'] == 'api:reviews-list'
+        assert record['status'] == 200
+        assert record['queries'] >= 2
+        slowest = record['slowest_sql']
+        assert len(slowest) == 2, (
+            'Проверьте, что в лог попадают REQUEST_TIMING_TOP_SQL запросов'
+        )
+        assert slowest[0]['ms'] >= slowest[1]['ms']
+        assert all(query['sql'].startswith('SELECT') for query in slowest)
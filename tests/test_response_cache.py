@@ -0,0 +1,145 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.db import DatabaseError
+from django.urls import reverse
+
+API_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api_yamdb'
+)
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+# Запись из другого процесса: своя база, общий с тестом кэш.
+OTHER_PROCESS_WRITE = """
+from django.core.management import call_command
+from reviews.models import Title
+
+call_command('migrate', verbosity=0)
+Title.objects.create(name='Из другого процесса', year=2000)
+"""
+
+
+@pytest.fixture
+def cache_backend(settings, tmp_path):
+    backend = {'BACKEND': FILE_CACHE, 'LOCATION': str(tmp_path / 'cache')}
+    settings.CACHES = {'default': backend}
+    yield backend
+    from django.core.cache import cache
+
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_hit_skips_serialization(self, cache_backend, api_client,
+                                     genres, django_assert_num_queries):
+        url = reverse('api:genre-list')
+        first = api_client.get(url)
+        assert first['X-Cache'] == 'MISS'
+
+        with django_assert_num_queries(0):
+            second = api_client.get(url)
+        assert second['X-Cache'] == 'HIT'
+        assert second.json() == first.json()
+
+        other = api_client.get(url, {'search': 'Жанр 1'})
+        assert other['X-Cache'] == 'MISS', (
+            'Проверьте, что ключ кэша учитывает строку запроса'
+        )
+
+    def test_write_invalidates(self, cache_backend, api_client, admin_client,
+                               genres, titles):
+        genre_url = reverse('api:genre-list')
+        title_url = reverse('api:title-list')
+        api_client.get(genre_url)
+        api_client.get(title_url)
+
+        response = admin_client.post(
+            genre_url, {'name': 'Новый', 'slug': 'new'}
+        )
+        assert response.status_code == 201
+        response = api_client.get(genre_url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['count'] == len(genres) + 1
+
+        response = api_client.get(title_url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что список произведений зависит от версии жанров'
+        )
+
+    def test_orm_write_invalidates(self, cache_backend, api_client,
+                                   genres, titles, reviews):
+        url = reverse('api:title-list')
+        writes = [
+            lambda: titles[1].genre.clear(),
+            lambda: genres[0].delete(),
+            lambda: reviews[0].author.delete(),
+        ]
+        for write in writes:
+            api_client.get(url)
+            assert api_client.get(url)['X-Cache'] == 'HIT'
+            write()
+            assert api_client.get(url)['X-Cache'] == 'MISS', (
+                'Проверьте, что изменения в обход API меняют версию данных'
+            )
+
+    def test_write_from_other_process(self, cache_backend, api_client,
+                                      titles, tmp_path):
+        url = reverse('api:title-list')
+        api_client.get(url)
+        etag = api_client.get(url)['ETag']
+        env = {
+            **os.environ,
+            'DB_ENGINE': 'django.db.backends.sqlite3',
+            'DB_NAME': str(tmp_path / 'other.sqlite3'),
+            'CACHE_BACKEND': cache_backend['BACKEND'],
+            'CACHE_LOCATION': cache_backend['LOCATION'],
+        }
+        subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c', OTHER_PROCESS_WRITE],
+            cwd=API_DIR, env=env, check=True,
+        )
+        assert api_client.get(url)['X-Cache'] == 'MISS', (
+            'Проверьте, что запись в другом процессе сбрасывает кэш ответов'
+        )
+        assert api_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == 200, (
+            'Проверьте, что запись в другом процессе меняет ETag'
+        )
+
+    def test_local_cache_disabled(self, settings, api_client, genres):
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        url = reverse('api:genre-list')
+        api_client.get(url)
+        assert 'X-Cache' not in api_client.get(url), (
+            'Проверьте, что кэш одного процесса не используется для ответов'
+        )
+
+    def test_authenticated_not_cached(self, cache_backend, admin_client,
+                                      genres):
+        url = reverse('api:genre-list')
+        admin_client.get(url)
+        assert 'X-Cache' not in admin_client.get(url)
+
+    def test_stale_if_error(self, cache_backend, api_client, admin_client,
+                            genres):
+        from django.db import connection
+
+        url = reverse('api:genre-list')
+        expected = api_client.get(url).json()
+        admin_client.delete(reverse('api:genre-detail', args=['genre-0']))
+
+        def database_down(execute, sql, params, many, context):
+            raise DatabaseError('database is down')
+
+        with connection.execute_wrapper(database_down):
+            response = api_client.get(url)
+        assert response.status_code == 200
+        assert response['X-Cache'] == 'STALE'
+        assert response.json() == expected
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+PARALLEL_POSTS = 8
+
+
+def _post_review(user, title_id, score):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client.post(
+        reverse('api:reviews-list', args=[title_id]),
+        {'text': 'Отзыв', 'score': score},
+    )
+
+
+@pytest.mark.django_db
+class TestReviewCreate:
+
+    def test_no_reads(self, user, titles):
+        title = titles[0]
+        with CaptureQueriesContext(connection) as context:
+            response = _post_review(user, title.pk, 7)
+        assert response.status_code == 201
+        statements = [query['sql'] for query in context.captured_queries]
+        assert not [sql for sql in statements if sql.startswith('SELECT')], (
+            'Проверьте, что создание отзыва не читает данные из базы'
+        )
+
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (7, 1)
+
+    def test_duplicate_and_missing_title(self, user, titles):
+        title = titles[0]
+        _post_review(user, title.pk, 7)
+        response = _post_review(user, title.pk, 3)
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв возвращает код 400'
+        )
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (7, 1), (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+        assert _post_review(user, 0, 3).status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_posts_create_one_review(user, titles):
+    from reviews.models import Review
+
+    if connection.vendor == 'sqlite':
+        pytest.skip('SQLite в памяти не допускает параллельной записи')
+    title = titles[0]
+    barrier = threading.Barrier(PARALLEL_POSTS)
+    statuses = []
+
+    def post():
+        barrier.wait()
+        try:
+            statuses.append(_post_review(user, title.pk, 5).status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=post) for _ in range(PARALLEL_POSTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] + [400] * (PARALLEL_POSTS - 1), (
+        'Проверьте, что параллельные запросы создают ровно один отзыв'
+    )
+    assert Review.objects.filter(title=title, author=user).count() == 1
+    title.refresh_from_db()
+    assert (title.rating_sum, title.rating_count) == (5, 1)
@@ -0,0 +1,80 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def _get(self, client, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, params)
+        assert response.status_code == 200, (
+            f'Проверьте, что запрос {url} с {params} возвращает код 200'
+        )
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        return response.json(), sql
+
+    def test_title_fields(self, user_client, titles, reviews):
+        data, sql = self._get(
+            user_client, reverse('api:title-list'),
+            {'fields': 'id,name,rating'},
+        )
+        assert set(data['results'][0]) == {'id', 'name', 'rating'}, (
+            'Проверьте, что ?fields= оставляет только запрошенные поля'
+        )
+        for unwanted in ('description', 'reviews_genre', 'reviews_category'):
+            assert unwanted not in sql, (
+                f'Проверьте, что {unwanted} не выбирается из базы'
+            )
+
+    def test_title_expand(self, user_client, titles, genres, category):
+        url = reverse('api:title-list')
+        data, _ = self._get(user_client, url, {'fields': 'genre,category'})
+        assert data['results'][0] == {
+            'genre': sorted((genre.slug for genre in genres), reverse=True),
+            'category': category.slug,
+        }
+
+        data, _ = self._get(
+            user_client, url,
+            {'fields': 'genre,category', 'expand': 'category'},
+        )
+        assert data['results'][0]['category'] == {
+            'name': category.name, 'slug': category.slug,
+        }
+
+        full, _ = self._get(user_client, url, {})
+        expanded, _ = self._get(
+            user_client, url, {'expand': 'genre,category'}
+        )
+        assert expanded == full, (
+            'Проверьте, что раскрытые связи совпадают с обычным ответом'
+        )
+
+    def test_review_fields_and_expand(self, user_client, reviews):
+        review = reviews[0]
+        url = reverse('api:reviews-list', args=[review.title_id])
+        data, sql = self._get(user_client, url, {'fields': 'id,score'})
+        assert set(data['results'][0]) == {'id', 'score'}
+        assert 'users_user' not in sql
+
+        data, _ = self._get(
+            user_client, url, {'fields': 'author', 'expand': 'author'}
+        )
+        assert data['results'][-1]['author'] == {
+            'username': review.author.username,
+            'first_name': review.author.first_name,
+            'last_name': review.author.last_name,
+            'bio': review.author.bio,
+        }
+
+    def test_unknown_fields(self, user_client, comments):
+        review = comments[0].review
+        url = reverse('api:comments-list', args=[review.title_id, review.pk])
+        for params in ({'fields': 'secret'}, {'expand': 'review'}):
+            response = user_client.get(url, params)
+            assert response.status_code == 400, (
+                'Проверьте, что неизвестные поля возвращают код 400'
+            )
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+
+import pytest
+from django.urls import reverse
+
+PARALLEL_REQUESTS = 20
+
+
+@pytest.fixture
+def auth_rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'auth_ip': '100/min', 'auth_username': '5/day',
+        },
+    }
+    return settings
+
+
+@pytest.mark.django_db
+def test_rejected_before_database(auth_rates, api_client, user,
+                                  django_assert_num_queries):
+    url = reverse('api:token')
+    data = {'username': user.username, 'confirmation_code': 'wrong'}
+    for _ in range(5):
+        assert api_client.post(url, data).status_code == 400
+
+    with django_assert_num_queries(0):
+        response = api_client.post(url, data)
+    assert response.status_code == 429, (
+        'Проверьте, что превышение лимита возвращает код 429'
+    )
+    assert int(response['Retry-After']) > 0
+
+    other = {'username': 'someone-else', 'confirmation_code': 'wrong'}
+    assert api_client.post(url, other).status_code != 429, (
+        'Проверьте, что лимит по имени не затрагивает других пользователей'
+    )
+
+
+@pytest.mark.django_db
+def test_spoofed_forwarded_for(auth_rates, api_client):
+    auth_rates.REST_FRAMEWORK = {
+        **auth_rates.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'auth_ip': '3/min', 'auth_username': '5/day',
+        },
+    }
+    url = reverse('api:token')
+
+    def post(i, forwarded_for):
+        # Последнюю запись добавляет nginx: это адрес клиента.
+        return api_client.post(
+            url, {'username': f'user{i}', 'confirmation_code': 'wrong'},
+            HTTP_X_FORWARDED_FOR=forwarded_for,
+        ).status_code
+
+    for i in range(3):
+        assert post(i, f'10.0.0.{i}, 203.0.113.7') != 429
+    assert post(3, '10.0.0.3, 203.0.113.7') == 429, (
+        'Проверьте, что подделанный X-Forwarded-For не сбрасывает лимит'
+    )
+    assert post(4, '203.0.113.8') != 429
+
+
+@pytest.mark.parametrize('store', ['local', 'file', 'cache'])
+def test_limits_under_concurrent_load(auth_rates, store):
+    from api.throttling import AuthUsernameThrottle
+    from rest_framework.parsers import JSONParser
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    auth_rates.THROTTLE_STORE = store
+    # LocMemCache, как и memcached, выполняет add атомарно.
+    auth_rates.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    factory = APIRequestFactory()
+    barrier = threading.Barrier(PARALLEL_REQUESTS)
+    allowed = []
+
+    def attempt():
+        request = Request(
+            factory.post('/', {'username': 'target'}, format='json'),
+            parsers=[JSONParser()],
+        )
+        barrier.wait()
+        allowed.append(AuthUsernameThrottle().allow_request(request, None))
+
+    threads = [
+        threading.Thread(target=attempt) for _ in range(PARALLEL_REQUESTS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert allowed.count(True) == 5, (
+        f'Проверьте, что хранилище {store} не пропускает лишних запросов'
+    )
+
+
+def test_file_store_bounded(tmp_path):
+    from api.throttling import FileBucketStore
+
+    store = FileBucketStore(str(tmp_path))
+    store.shards = 1
+    capacity, rate = 5, 5 / 86400
+    for i in range(100):
+        assert store.consume(f'user{i}', capacity, rate, 0) == 0
+    assert len(os.listdir(tmp_path)) == 1, (
+        'Проверьте, что число файлов корзин не растёт с числом ключей'
+    )
+
+    for _ in range(capacity - 1):
+        store.consume('user0', capacity, rate, 1)
+    assert store.consume('user0', capacity, rate, 2) > 0, (
+        'Проверьте, что корзины разных ключей в одном файле не сбрасываются'
+    )
+
+    store.consume('late', capacity, rate, 86400 * 2)
+    with open(os.path.join(tmp_path, os.listdir(tmp_path)[0])) as f:
+        buckets = json.load(f)
+    assert set(buckets) == {'late'}, (
+        'Проверьте, что наполнившиеся корзины удаляются из файлов'
+    )
@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+PARALLEL_REBUILDS = 5
+
+
+@pytest.mark.django_db
+class TestTitleDocuments:
+
+    def _title(self, client, title_id):
+        response = client.get(reverse('api:title-detail', args=[title_id]))
+        assert response.status_code == 200
+        return response.json()
+
+    def test_matches_serializer(self, user_client, reviews):
+        from api.serializers import TitleListSerializer
+        from reviews.models import Title, TitleDocument
+
+        title = Title.objects.get(pk=reviews[0].title_id)
+        assert TitleDocument.objects.filter(title=title).exists(), (
+            'Проверьте, что документ создаётся при сохранении произведения'
+        )
+        expected = dict(TitleListSerializer(title).data)
+        assert self._title(user_client, title.pk) == expected
+
+    def test_rebuilt_on_changes(self, admin_client, user_client, titles,
+                                genres, category):
+        title = titles[0]
+        url = reverse('api:title-detail', args=[title.pk])
+
+        response = admin_client.patch(url, {'name': 'Новое название'})
+        assert response.status_code == 200
+        assert self._title(user_client, title.pk)['name'] == 'Новое название'
+
+        admin_client.patch(url, {'genre': [genres[0].slug]})
+        assert self._title(user_client, title.pk)['genre'] == [
+            {'name': genres[0].name, 'slug': genres[0].slug}
+        ]
+
+        admin_client.delete(reverse('api:genre-detail', args=[genres[0].slug]))
+        assert self._title(user_client, title.pk)['genre'] == []
+
+        admin_client.delete(
+            reverse('api:category-detail', args=[category.slug])
+        )
+        assert self._title(user_client, title.pk)['category'] is None
+
+    def test_rating_is_current(self, user_client, titles):
+        title = titles[0]
+        url = reverse('api:reviews-list', args=[title.pk])
+
+        user_client.post(url, {'text': 'Отзыв', 'score': 7})
+        assert self._title(user_client, title.pk)['rating'] == 7
+
+    def test_missing_documents(self, user_client, reviews,
+                               django_assert_max_num_queries):
+        from reviews.models import TitleDocument
+
+        url = reverse('api:title-list')
+        expected = user_client.get(url).json()
+        TitleDocument.objects.all().delete()
+
+        # Количество, страница, произведения без документов и их жанры.
+        with django_assert_max_num_queries(4):
+            response = user_client.get(url)
+        assert response.json() == expected, (
+            'Проверьте, что произведения без документов собираются '
+            'одной выборкой на страницу'
+        )
+        assert self._title(user_client, reviews[0].title_id) == next(
+            title for title in expected['results']
+            if title['id'] == reviews[0].title_id
+        )
+
+    def test_backfill_migration(self, titles):
+        from importlib import import_module
+
+        from api.documents import rebuild_title_documents
+        from django.apps import apps
+        from reviews.models import TitleDocument
+
+        migration = import_module(
+            'reviews.migrations.0008_backfill_title_documents'
+        )
+        rebuild_title_documents()
+        expected = dict(TitleDocument.objects.values_list('pk', 'body'))
+        TitleDocument.objects.all().delete()
+
+        migration.backfill(apps, None)
+        assert dict(
+            TitleDocument.objects.values_list('pk', 'body')
+        ) == expected, (
+            'Проверьте, что миграция создаёт документы в формате '
+            'сериализатора'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_rebuilds(titles):
+    from api.documents import rebuild_title_documents
+    from reviews.models import TitleDocument
+
+    if connection.vendor == 'sqlite':
+        pytest.skip('SQLite в памяти не допускает параллельной записи')
+    title_ids = [title.pk for title in titles]
+    barrier = threading.Barrier(PARALLEL_REBUILDS)
+    errors = []
+
+    def rebuild():
+        barrier.wait()
+        try:
+            rebuild_title_documents(title_ids)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=rebuild) for _ in range(PARALLEL_REBUILDS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, (
+        'Проверьте, что параллельные пересборки документов не конфликтуют'
+    )
+    assert TitleDocument.objects.count() == len(title_ids)
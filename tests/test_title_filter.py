@@ -0,0 +1,58 @@
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestTitleFilter:
+
+    def _names(self, client, **params):
+        response = client.get(reverse('api:title-list'), params)
+        assert response.status_code == 200
+        return {title['name'] for title in response.json()['results']}
+
+    def test_name_substring(self, api_client, titles):
+        from reviews.models import Title
+
+        Title.objects.create(name='Крестный отец', year=1972)
+        Title.objects.create(name='Отель «Гранд Будапешт»', year=2014)
+
+        assert self._names(api_client, name='рестный') == {'Крестный отец'}
+        assert self._names(api_client, name='отец') == {'Крестный отец'}
+        assert self._names(api_client, name='Будапешт') == {
+            'Отель «Гранд Будапешт»'
+        }
+        assert self._names(api_client, name='19') == {
+            'Произведение 19'
+        }, 'Проверьте поиск по подстроке короче трёх символов'
+        assert not self._names(api_client, name='%')
+
+    def test_name_follows_updates(self, api_client, titles):
+        title = titles[0]
+        title.name = 'Новое название'
+        title.save()
+
+        assert self._names(api_client, name='вое назв') == {'Новое название'}
+        title.delete()
+        assert not self._names(api_client, name='вое назв')
+
+    def test_slug_filters(self, api_client, titles, category):
+        from reviews.models import Genre, Title
+
+        rock = Genre.objects.create(name='Рок', slug='rock')
+        rock_n_roll = Genre.objects.create(
+            name='Рок-н-ролл', slug='rock-n-roll'
+        )
+        first = Title.objects.create(name='Первое', year=1970)
+        first.genre.set([rock])
+        second = Title.objects.create(name='Второе', year=1960)
+        second.genre.set([rock_n_roll, rock])
+
+        assert self._names(api_client, genre='rock') == {'Первое', 'Второе'}
+        assert self._names(api_client, genre='n-ro') == {'Второе'}
+        third = Title.objects.create(name='Третье', year=1958)
+        third.genre.set([rock_n_roll])
+        assert self._names(api_client, genre='rock') == {
+            'Первое', 'Второе', 'Третье'
+        }, 'Проверьте, что точное совпадение slug не отменяет поиск подстроки'
+        assert len(self._names(api_client, category='mov')) == 20
+        assert not self._names(api_client, genre='unknown')
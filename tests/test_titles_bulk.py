@@ -0,0 +1,125 @@
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestTitlesBulk:
+
+    url = reverse('api:title-bulk')
+
+    def _item(self, name, genres, category, year=2000):
+        return {
+            'name': name,
+            'year': year,
+            'genre': [genre.slug for genre in genres],
+            'category': category.slug,
+        }
+
+    def test_create(self, admin_client, genres, category,
+                    django_assert_max_num_queries):
+        from reviews.models import Title
+
+        items = [self._item(f'Пачка {i}', genres, category) for i in range(30)]
+        # Запросы не растут с размером пачки, кроме вставок на SQLite.
+        with django_assert_max_num_queries(len(items) + 12):
+            response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что корректная пачка возвращает код 201'
+        )
+        assert [item['data']['name'] for item in response.json()] == [
+            item['name'] for item in items
+        ]
+        title = Title.objects.get(name='Пачка 0')
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            genre.slug for genre in genres
+        }
+        assert title.document.body, (
+            'Проверьте, что для новых произведений собираются документы'
+        )
+
+    def test_partial_errors(self, admin_client, genres, category):
+        from reviews.models import Title
+
+        items = [
+            self._item('Верное', genres, category),
+            self._item('Неизвестный жанр', genres, category),
+            self._item('Из будущего', genres, category, year=3000),
+            'не объект',
+        ]
+        items[1]['genre'] = ['no-such-genre']
+        response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 207, (
+            'Проверьте, что частично корректная пачка возвращает код 207'
+        )
+        assert [item['status'] for item in response.json()] == [
+            201, 400, 400, 400
+        ]
+        assert 'genre' in response.json()[1]['errors']
+        assert 'year' in response.json()[2]['errors']
+        assert list(Title.objects.values_list('name', flat=True)) == [
+            'Верное'
+        ]
+
+    def test_rejected(self, admin_client, user_client, genres, category):
+        item = self._item('Произведение', genres, category)
+        assert admin_client.post(
+            self.url, item, format='json'
+        ).status_code == 400, 'Проверьте, что тело должно быть списком'
+        assert user_client.post(
+            self.url, [item], format='json'
+        ).status_code == 403, 'Проверьте, что пачку может создать только админ'
+
+    def test_duplicate_genres(self, admin_client, genres, category):
+        from reviews.models import Title
+
+        item = self._item('Повторы', genres[:1] * 3, category)
+        response = admin_client.post(self.url, [item], format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что повторы жанров в элементе не ломают запись'
+        )
+        assert list(
+            Title.objects.get(name='Повторы').genre.values_list(
+                'slug', flat=True
+            )
+        ) == [genres[0].slug]
+
+    def test_update(self, admin_client, user_client, titles, genres,
+                    category):
+        from reviews.models import Title
+
+        first, second = titles[0], titles[1]
+        items = [
+            {'id': first.pk, 'name': 'Новое имя'},
+            {'id': second.pk, 'genre': [genres[1].slug, genres[1].slug]},
+            self._item('Новое', genres[:1], category),
+            {'id': first.pk, 'year': 1990},
+            {'id': 0, 'name': 'Нет такого'},
+            {'id': second.pk + 1, 'year': 3000},
+        ]
+        response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 207
+        data = response.json()
+        assert [item['status'] for item in data] == [
+            200, 200, 201, 400, 400, 400
+        ], 'Проверьте, что элементы с id изменяют произведения'
+        assert 'id' in data[3]['errors'] and 'id' in data[4]['errors']
+        assert 'year' in data[5]['errors']
+
+        first.refresh_from_db()
+        assert (first.name, first.year) == ('Новое имя', titles[0].year), (
+            'Проверьте, что изменяются только переданные поля'
+        )
+        assert set(first.genre.values_list('slug', flat=True)) == {
+            genre.slug for genre in genres
+        }
+        assert list(second.genre.values_list('slug', flat=True)) == [
+            genres[1].slug
+        ]
+        assert data[1]['data']['genre'] == [genres[1].slug]
+        detail = user_client.get(
+            reverse('api:title-detail', args=[first.pk])
+        ).json()
+        assert detail['name'] == 'Новое имя', (
+            'Проверьте, что документы изменённых произведений пересобраны'
+        )
+        assert Title.objects.filter(name='Нет такого').count() == 0
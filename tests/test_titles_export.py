@@ -0,0 +1,39 @@
+import json
+
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestTitlesExport:
+
+    url = reverse('api:title-export')
+
+    def _lines(self, response):
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_matches_detail(self, admin_client, titles, reviews):
+        rows = self._lines(admin_client.get(self.url))
+        assert [row['id'] for row in rows] == sorted(
+            title.pk for title in titles
+        ), 'Проверьте, что выгружаются все произведения'
+        for row in rows[:3]:
+            detail = admin_client.get(
+                reverse('api:title-detail', args=[row['id']])
+            ).json()
+            assert row == detail, (
+                'Проверьте, что строка выгрузки совпадает с карточкой'
+            )
+
+    def test_filters(self, admin_client, titles):
+        rows = self._lines(admin_client.get(self.url, {'year': 2001}))
+        assert [row['name'] for row in rows] == [
+            title.name for title in titles if title.year == 2001
+        ]
+
+    def test_admin_only(self, client, user_client, titles):
+        assert client.get(self.url).status_code == 401
+        assert user_client.get(self.url).status_code == 403